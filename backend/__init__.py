@@ -1,30 +1,46 @@
-"""Backend package for reusable workflow functions."""
+"""Backend package for reusable workflow functions.
+
+Submodules are imported on first attribute access, so commands that never
+touch a model (collecting, converting, uploading, ...) do not pay for the
+ultralytics/torch import.
+"""
+
+import importlib
 
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file before importing other modules.
 load_dotenv()
 
-from .yolo import run_prediction, run_training
-from .collect_images import collect_images, setup_logger as setup_collect_logger
-from .convert_yolo_to_ls import convert_yolo_to_ls
-from .download_annotated import download_annotated
-from .generate_data_yaml import generate_data_yaml
-from .index_predictions_by_class import index_predictions
-from .stage_predictions_for_upload import stage_predictions
-from .train_yolo import run_training as run_full_training
-from .upload_gcs import upload as upload_gcs
-
-__all__ = [
-    "run_prediction",
-    "run_training",
-    "collect_images",
-    "setup_collect_logger",
-    "convert_yolo_to_ls",
-    "download_annotated",
-    "generate_data_yaml",
-    "index_predictions",
-    "stage_predictions",
-    "run_full_training",
-    "upload_gcs",
-]
+# Public name -> (submodule, attribute)
+_EXPORTS = {
+    "run_prediction": ("yolo", "run_prediction"),
+    "run_training": ("yolo", "run_training"),
+    "collect_images": ("collect_images", "collect_images"),
+    "setup_collect_logger": ("collect_images", "setup_logger"),
+    "convert_yolo_to_ls": ("convert_yolo_to_ls", "convert_yolo_to_ls"),
+    "download_annotated": ("download_annotated", "download_annotated"),
+    "generate_data_yaml": ("generate_data_yaml", "generate_data_yaml"),
+    "index_predictions": ("index_predictions_by_class", "index_predictions"),
+    "stage_predictions": ("stage_predictions_for_upload", "stage_predictions"),
+    "run_full_training": ("train_yolo", "run_training"),
+    "upload_gcs": ("upload_gcs", "upload"),
+    "WorkflowDatabase": ("database", "WorkflowDatabase"),
+    "run_pipeline": ("pipeline", "run_pipeline"),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module_name, attr = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(f".{module_name}", __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
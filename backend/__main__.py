@@ -0,0 +1,52 @@
+"""Single entry point: ``python -m backend <command> [args...]``.
+
+Only the module for the requested command is imported, so non-model
+commands start without loading ultralytics or torch.
+"""
+
+import importlib
+import sys
+
+# Command -> (submodule, mode override passed to ``backend.yolo``)
+COMMANDS = {
+    "collect": ("collect_images", None),
+    "convert": ("convert_yolo_to_ls", None),
+    "download": ("download_annotated", None),
+    "data-yaml": ("generate_data_yaml", None),
+    "index": ("index_predictions_by_class", None),
+    "detection-index": ("detection_index", None),
+    "stage": ("stage_predictions_for_upload", None),
+    "upload": ("upload_gcs", None),
+    "shards": ("shards", None),
+    "pipeline": ("pipeline", None),
+    "predict": ("yolo", "predict"),
+    "train": ("yolo", "train"),
+    "yolo": ("yolo", None),
+    "serve": ("predict_server", None),
+}
+
+
+def usage() -> str:
+    return "Usage: python -m backend <command> [args...]\n\nCommands:\n" + "\n".join(
+        f"  {name:<16} backend.{module}" for name, (module, _) in COMMANDS.items()
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(usage())
+        sys.exit(1)
+
+    module_name, mode = COMMANDS[argv[0]]
+    module = importlib.import_module(f".{module_name}", __package__)
+    # Module entry points fall back to ``sys.argv`` when given no arguments.
+    sys.argv = [f"{sys.argv[0]} {argv[0]}", *argv[1:]]
+    if mode is not None:
+        module.main(argv[1:], mode_override=mode)
+    else:
+        module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 import os
 import sys
 import json
-import shutil
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from filecmp import cmp
-from .utils import emit_status, set_status_callback, ensure_dir
+from .database import open_database
+from .manifest import Manifest, ManifestEntry, resolve_manifest_path
+from .materialize import materialize
+from .utils import emit_status, set_status_callback, ensure_dir, file_digest
+
+_CHUNK_SIZE = 64
 
 
 def setup_logger(log_dir: Path):
@@ -42,6 +47,89 @@ def get_unique_name(dest_dir, original_name, source_prefix, method):
         raise ValueError(f"Unknown rename_scheme: {method}")
 
 
+class NameIndex:
+    """In-memory view of the names present in a destination directory.
+
+    Built from a single directory listing, it answers existence checks and
+    picks unique names without touching the filesystem. For the
+    ``sequential`` scheme the next free suffix is remembered per name, so
+    repeated clashes cost constant time instead of re-probing from ``_0``.
+    """
+
+    def __init__(self, names=()):
+        self._names = set(names)
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def add(self, name):
+        with self._lock:
+            self._names.add(name)
+
+    def unique(self, original_name, source_prefix, method):
+        """Reserve and return a name following :func:`get_unique_name` rules."""
+        with self._lock:
+            if method == "sequential":
+                base = Path(original_name).stem
+                ext = Path(original_name).suffix.lower()
+                key = f"{base}{ext}"
+                i = self._next.get(key, -1)
+                while True:
+                    new_name = f"{base}{ext}" if i < 0 else f"{base}_{i}{ext}"
+                    i += 1
+                    if new_name not in self._names:
+                        break
+                self._next[key] = i
+            else:
+                new_name = get_unique_name(None, original_name, source_prefix, method)
+            self._names.add(new_name)
+            return new_name
+
+
+def _same_content(src: Path, dst: Path, src_stat=None, src_digest=None) -> bool:
+    """Return ``True`` if ``src`` and ``dst`` hold the same bytes.
+
+    Sizes are compared first and matching modification times are trusted, so
+    the content hash is only computed for same-sized files whose timestamps
+    disagree.
+    """
+    src_stat = src_stat or src.stat()
+    dst_stat = dst.stat()
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    return (src_digest or file_digest(src)) == file_digest(dst)
+
+
+def _group_by_destination(sources, valid_exts):
+    """Map each destination name to the ``(file, prefix, stat)`` entries that target it."""
+    groups = {}
+    for source in sources:
+        source_path = Path(source)
+        prefix = source_path.name
+        if not source_path.exists():
+            logging.warning(f"Source not found: {source_path}")
+            continue
+
+        with os.scandir(source_path) as it:
+            for entry in it:
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext not in valid_exts or not entry.is_file():
+                    continue
+                file = source_path / entry.name
+                dest_name = f"{file.stem}{ext}"
+                groups.setdefault(dest_name, []).append((file, prefix, entry.stat()))
+    return groups
+
+
+def _list_files(directory: Path) -> list[str]:
+    with os.scandir(directory) as it:
+        return [entry.name for entry in it if entry.is_file()]
+
+
 def collect_images(cfg, db=None):
     sources = cfg["sources"]
     dest_dir = Path(cfg["destination"])
@@ -49,11 +137,15 @@ def collect_images(cfg, db=None):
     rename_only_on_conflict = cfg.get("rename_only_on_conflict", False)
     delete_missing = cfg.get("delete_missing_in_sources", False)
     valid_exts = {ext.lower() for ext in cfg.get("extensions", [".jpg", ".jpeg", ".png"])}
+    workers = int(cfg.get("workers", 1))
+    mode = cfg.get("materialize", "copy")
+    manifest_path = resolve_manifest_path(cfg.get("manifest"), "collect", dest_dir)
 
     ensure_dir(dest_dir)
+    started_at = datetime.now().isoformat()
     seen_files = set()
     total, copied, renamed, skipped = 0, 0, 0, 0
-    emit_status('start', action='collect_images', sources=len(sources))
+    emit_status('start', action='collect_images', sources=len(sources), workers=workers)
 
     if db is not None:
         db.logActivity({
@@ -79,60 +171,127 @@ def collect_images(cfg, db=None):
 
         set_status_callback(_cb)
 
-    for source in sources:
-        source_path = Path(source)
-        prefix = source_path.name
-        if not source_path.exists():
-            logging.warning(f"Source not found: {source_path}")
-            continue
+    manifest = Manifest(manifest_path) if manifest_path else None
+    previous = manifest.load() if manifest else {}
+    updates = []
 
-        for file in source_path.iterdir():
-            if file.suffix.lower() not in valid_exts or not file.is_file():
-                continue
+    existing_files = _list_files(dest_dir)
+    existing = NameIndex(existing_files)
+    groups = _group_by_destination(sources, valid_exts)
+    names = NameIndex(existing_files)
+    for name in groups:
+        names.add(name)
 
-            base = file.stem
-            ext = file.suffix.lower()
-            dest_file = dest_dir / f"{base}{ext}"
+    def _process(dest_name, entries):
+        # Every source file that maps onto ``dest_name`` is handled in order by
+        # a single worker, so clashes inside one run resolve exactly as they
+        # would sequentially while unrelated names are copied concurrently.
+        dest_file = dest_dir / dest_name
+        outcomes = []
+        for file, prefix, st in entries:
+            prev = previous.get(str(file))
+            # Files are only hashed to tell a touched file from a changed one,
+            # or by ``_same_content`` when they clash with another file.
+            digest = None
+            if prev is not None and prev.target in existing:
+                if prev.size == st.st_size and prev.mtime_ns == st.st_mtime_ns:
+                    logging.debug(f"[SKIP] Unchanged: {file.name}")
+                    outcomes.append(('skipped', file, prev.target))
+                    continue
+                if prev.digest is not None:
+                    digest = file_digest(file)
+                    unchanged = prev.digest == digest
+                else:
+                    unchanged = _same_content(file, dest_dir / prev.target, st)
+                if unchanged:
+                    logging.info(f"[SKIP] Unchanged: {file.name}")
+                    outcomes.append(('skipped', file, prev.target))
+                    updates.append(ManifestEntry(str(file), st.st_size, st.st_mtime_ns, digest, prev.target))
+                    continue
 
-            if not dest_file.exists():
-                shutil.copy(file, dest_file)
-                seen_files.add(dest_file.name.lower())
+            if dest_name not in existing:
+                materialize(file, dest_file, mode)
+                existing.add(dest_name)
                 logging.info(f"[ADD] {file} → {dest_file}")
-                copied += 1
-                emit_status('copied', file=str(file))
-            elif cmp(file, dest_file, shallow=False):
-                seen_files.add(dest_file.name.lower())
+                action, target = 'copied', dest_name
+            elif _same_content(file, dest_file, st, digest):
                 logging.info(f"[SKIP] Identical: {file.name}")
-                skipped += 1
-                emit_status('skipped', file=str(file))
+                action, target = 'skipped', dest_name
+            elif rename_only_on_conflict and (prev is None or prev.target != dest_name):
+                target = names.unique(file.name, prefix, rename_scheme)
+                materialize(file, dest_dir / target, mode)
+                existing.add(target)
+                logging.info(f"[RENAME] Conflict: {file.name} → {target}")
+                action = 'renamed'
             else:
-                if rename_only_on_conflict:
-                    new_name = get_unique_name(dest_dir, file.name, prefix, rename_scheme)
-                    new_dest = dest_dir / new_name
-                    shutil.copy(file, new_dest)
-                    seen_files.add(new_dest.name.lower())
-                    logging.info(f"[RENAME] Conflict: {file.name} → {new_name}")
+                materialize(file, dest_file, mode)
+                logging.info(f"[OVERWRITE] {file} → {dest_file}")
+                action, target = 'overwritten', dest_name
+            outcomes.append((action, file, target))
+            if manifest:
+                updates.append(ManifestEntry(str(file), st.st_size, st.st_mtime_ns, digest, target))
+        return outcomes
+
+    def _process_chunk(chunk):
+        return [outcome for name, entries in chunk for outcome in _process(name, entries)]
+
+    # Groups are submitted in small chunks to keep executor overhead low when
+    # most files are unchanged and need no I/O at all.
+    items = list(groups.items())
+    chunks = [items[i:i + _CHUNK_SIZE] for i in range(0, len(items), _CHUNK_SIZE)]
+    per_source = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(_process_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for action, file, name in future.result():
+                seen_files.add(name.lower())
+                total += 1
+                if action != 'skipped':
+                    per_source.setdefault(str(file.parent), []).append(file)
+                if action == 'skipped':
+                    skipped += 1
+                    emit_status('skipped', file=str(file))
+                elif action == 'renamed':
                     renamed += 1
-                    emit_status('renamed', file=str(file), new_name=new_name)
+                    emit_status('renamed', file=str(file), new_name=name)
                 else:
-                    shutil.copy(file, dest_file)
-                    seen_files.add(dest_file.name.lower())
-                    logging.info(f"[OVERWRITE] {file} → {dest_file}")
                     copied += 1
-                    emit_status('overwritten', file=str(file))
-
-            total += 1
+                    emit_status(action, file=str(file))
 
     if delete_missing:
-        for existing_file in dest_dir.iterdir():
-            if existing_file.is_file() and existing_file.name.lower() not in seen_files:
+        # Deletions are derived from the listing taken at the start of the run,
+        # so the destination is not walked a second time.
+        for name in existing_files:
+            if name.lower() not in seen_files:
+                existing_file = dest_dir / name
                 existing_file.unlink()
                 logging.info(f"[DELETE] Removed missing source file: {existing_file.name}")
                 emit_status('deleted', file=str(existing_file))
 
+    if manifest:
+        current = {str(file) for entries in groups.values() for file, _, _ in entries}
+        manifest.update(updates)
+        manifest.remove(path for path in previous if path not in current)
+        manifest.close()
+
     emit_status('complete', action='collect_images', total=total, copied=copied, renamed=renamed, skipped=skipped)
     if db is not None:
         set_status_callback(None)
+        if hasattr(db, 'addFileOperations'):
+            sizes = {file: st.st_size for entries in groups.values() for file, _, st in entries}
+            completed_at = datetime.now().isoformat()
+            db.addFileOperations({
+                'operation_type': 'collect',
+                'source_path': source,
+                'destination_path': str(dest_dir),
+                'file_count': len(files),
+                'bytes_processed': sum(sizes[file] for file in files),
+                'status': 'completed',
+                'progress': 1.0,
+                'config': json.dumps(cfg),
+                'started_at': started_at,
+                'completed_at': completed_at,
+            } for source, files in per_source.items())
     return {
         'total': total,
         'copied': copied,
@@ -160,7 +319,12 @@ def run(config_path: str, db=None) -> None:
     logging.info(f"Rename scheme: {cfg.get('rename_scheme', 'source_prefix')}")
     logging.info(f"Delete missing in sources: {cfg.get('delete_missing_in_sources', False)}")
 
-    collect_images(cfg, db=db)
+    owned = open_database(cfg.get("database")) if db is None else None
+    try:
+        collect_images(cfg, db=db or owned)
+    finally:
+        if owned is not None:
+            owned.close()
 
     logging.info("=== Collection Complete ===")
     print(f"[INFO] Log written to {log_path}")
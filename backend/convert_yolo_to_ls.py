@@ -4,7 +4,30 @@ import json
 import logging
 import sys
 from pathlib import Path
-from .utils import emit_status
+from .image_probe import ImageSizeCache, read_image_size
+from .utils import emit_status, index_by_stem
+from .writers import open_record_writer
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Used when an image header cannot be parsed.
+DEFAULT_SIZE = (9216, 5184)
+
+
+def _open_size_cache(setting):
+    """Return an :class:`ImageSizeCache` for a ``size_cache`` config value."""
+    if not setting:
+        return None
+    return ImageSizeCache(None if setting is True else setting)
+
+
+def _image_size(image_path, size_cache=None):
+    try:
+        if size_cache is not None:
+            return size_cache.size_of(image_path)
+        return read_image_size(image_path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read size of {image_path.name} ({e}); using {DEFAULT_SIZE}")
+        return DEFAULT_SIZE
 
 
 def load_classes(class_file):
@@ -23,63 +46,65 @@ def convert_yolo_to_ls(cfg):
 
     classes = load_classes(class_file)
     label_files = sorted(label_dir.glob('*.txt'))
-    tasks = []
-
-    for label_file in label_files:
-        image_name = label_file.stem
-        image_path_jpg = image_dir / f"{image_name}.jpg"
-        image_path_JPG = image_dir / f"{image_name}.JPG"
-
-        if image_path_jpg.exists():
-            image_path = image_path_jpg
-        elif image_path_JPG.exists():
-            image_path = image_path_JPG
-        else:
-            logging.warning(f"Image not found for label: {label_file.name}")
-            continue
-
-        with open(label_file, 'r') as f:
-            lines = f.readlines()
-
-        results = []
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) != 5:
+    images = index_by_stem(image_dir, IMAGE_EXTENSIONS)
+    size_cache = _open_size_cache(cfg.get('size_cache', True))
+    stream = cfg.get('stream', False)
+    tasks = None if stream else []
+    writer = open_record_writer(output_file, cfg.get('output_format'), cfg.get('gzip'))
+
+    try:
+        for label_file in label_files:
+            image_path = images.get(label_file.stem)
+            if image_path is None:
+                logging.warning(f"Image not found for label: {label_file.name}")
                 continue
-            cls_id, x, y, w, h = map(float, parts)
-            label = classes[int(cls_id)]
-            results.append({
-                "original_width": 9216,
-                "original_height": 5184,
-                "image_rotation": 0,
-                "value": {
-                    "x": (x - w / 2) * 100,
-                    "y": (y - h / 2) * 100,
-                    "width": w * 100,
-                    "height": h * 100,
-                    "rotation": 0,
-                    "rectanglelabels": [label],
-                },
-                "from_name": "label",
-                "to_name": "image",
-                "type": "rectanglelabels",
-                "origin": "manual",
-                "id": None,
-            })
-
-        task = {
-            "data": {"image": f"{image_prefix}{image_path.name}"},
-            "annotations": [{"result": results}],
-        }
-        tasks.append(task)
-        emit_status('converted', label=str(label_file), image=str(image_path))
-
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, 'w') as f:
-        json.dump(tasks, f, indent=2)
-
-    emit_status('complete', action='convert_yolo_to_ls', tasks=len(tasks), output=str(output_file))
-    return tasks
+            width, height = _image_size(image_path, size_cache)
+
+            with open(label_file, 'r') as f:
+                lines = f.readlines()
+
+            results = []
+            for line in lines:
+                parts = line.strip().split()
+                if len(parts) != 5:
+                    continue
+                cls_id, x, y, w, h = map(float, parts)
+                label = classes[int(cls_id)]
+                results.append({
+                    "original_width": width,
+                    "original_height": height,
+                    "image_rotation": 0,
+                    "value": {
+                        "x": (x - w / 2) * 100,
+                        "y": (y - h / 2) * 100,
+                        "width": w * 100,
+                        "height": h * 100,
+                        "rotation": 0,
+                        "rectanglelabels": [label],
+                    },
+                    "from_name": "label",
+                    "to_name": "image",
+                    "type": "rectanglelabels",
+                    "origin": "manual",
+                    "id": None,
+                })
+
+            task = {
+                "data": {"image": f"{image_prefix}{image_path.name}"},
+                "annotations": [{"result": results}],
+            }
+            writer.write(task)
+            if tasks is not None:
+                tasks.append(task)
+            emit_status('converted', label=str(label_file), image=str(image_path))
+
+    finally:
+        writer.close()
+        if size_cache is not None:
+            size_cache.close()
+
+    emit_status('complete', action='convert_yolo_to_ls', tasks=writer.count, output=str(output_file))
+    return tasks if tasks is not None else writer.count
 
 
 def run(config_path: str) -> None:
@@ -0,0 +1,220 @@
+"""Python access to the workflow SQLite database used by the site.
+
+:class:`WorkflowDatabase` mirrors the method names of ``site/lib/database.ts``
+(``createPrediction``, ``updatePrediction``, ``logActivity``, ...) so it can be
+passed as the ``db`` argument of the backend steps. It uses the schema in
+``site/scripts/init_database.sql``, runs SQLite in WAL mode and batches
+writes: progress updates to the same row are merged in memory and written,
+together with queued inserts, in one transaction once ``flush_count``
+changes are pending or ``flush_interval`` seconds have passed. Terminal
+status changes are written immediately.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from .utils import ensure_dir
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "site" / "scripts" / "init_database.sql"
+
+# Backend steps report "complete"/"running"; map them onto the values allowed
+# by the CHECK constraints of each table.
+_STATUS_ALIASES = {
+    "predictions": {"complete": "completed", "error": "failed"},
+    "training_sessions": {"complete": "completed", "error": "failed"},
+    "file_operations": {"complete": "completed", "error": "failed"},
+    "activity_logs": {"running": "info", "complete": "success", "completed": "success", "failed": "error"},
+}
+# Updates and log rows carrying one of these are written immediately.
+_TERMINAL_STATUSES = {"completed", "failed", "cancelled", "success", "error"}
+
+
+def default_db_path() -> Path:
+    data_dir = Path(os.getenv("DATA_DIR", "./data"))
+    return Path(os.getenv("DB_PATH", data_dir / "workflow.db"))
+
+
+def open_database(setting) -> "WorkflowDatabase | None":
+    """Return a :class:`WorkflowDatabase` for a ``database`` config value.
+
+    ``True`` opens :func:`default_db_path`, a string is used as the database
+    path and any false value disables database writes.
+    """
+    if not setting:
+        return None
+    return WorkflowDatabase(None if setting is True else setting)
+
+
+class WorkflowDatabase:
+    """Batched writer for the ``workflow.db`` tables."""
+
+    def __init__(self, path: str | Path | None = None, flush_interval: float = 1.0, flush_count: int = 500):
+        self.path = Path(path) if path else default_db_path()
+        self.flush_interval = flush_interval
+        self.flush_count = flush_count
+        ensure_dir(self.path.parent)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        if SCHEMA_PATH.exists():
+            self._apply_schema(SCHEMA_PATH.read_text())
+        self._columns: dict[str, set[str]] = {}
+        self._updates: dict[tuple[str, int], dict] = {}
+        self._inserts: dict[str, list[tuple]] = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.transactions = 0
+
+    # -- helpers -----------------------------------------------------------
+
+    def _apply_schema(self, script: str) -> None:
+        # Statements are applied one by one: a database created by the site
+        # has older tables, and indexes on columns they lack are skipped.
+        with self._conn:
+            for statement in script.split(";"):
+                if statement.strip():
+                    try:
+                        self._conn.execute(statement)
+                    except sqlite3.OperationalError as exc:
+                        code = [line for line in statement.splitlines() if not line.lstrip().startswith("--")]
+                        is_index = "\n".join(code).lstrip().upper().startswith("CREATE INDEX")
+                        if not (is_index and str(exc).startswith("no such column")):
+                            raise
+                        logging.info("Skipping index on a missing column: %s", exc)
+
+    def _table_columns(self, table: str) -> set[str]:
+        if table not in self._columns:
+            self._columns[table] = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        return self._columns[table]
+
+    def _clean(self, table: str, values: dict) -> dict:
+        columns = self._table_columns(table)
+        unknown = set(values) - columns
+        if unknown:
+            raise ValueError(f"Unknown {table} columns: {', '.join(sorted(unknown))}")
+        values = dict(values)
+        if "status" in values:
+            values["status"] = _STATUS_ALIASES.get(table, {}).get(values["status"], values["status"])
+        return values
+
+    def _with_defaults(self, table: str, values: dict, defaults: dict) -> dict:
+        # The site creates a smaller schema than init_database.sql; only fill
+        # the NOT NULL columns that exist in the database at hand.
+        columns = self._table_columns(table)
+        values = dict(values)
+        for name, value in defaults.items():
+            if name in columns:
+                values.setdefault(name, value)
+        return values
+
+    def _insert_now(self, table: str, values: dict) -> int:
+        values = self._clean(table, values)
+        names = ", ".join(values)
+        marks = ", ".join("?" for _ in values)
+        with self._lock, self._conn:
+            cur = self._conn.execute(f"INSERT INTO {table} ({names}) VALUES ({marks})", tuple(values.values()))
+            self.transactions += 1
+            return cur.lastrowid
+
+    def _queue_insert(self, table: str, values: dict) -> None:
+        values = self._clean(table, values)
+        names = tuple(values)
+        sql = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"
+        with self._lock:
+            self._inserts.setdefault(sql, []).append(tuple(values.values()))
+            self._pending += 1
+            if values.get("status") in _TERMINAL_STATUSES:
+                self.flush()
+            else:
+                self._maybe_flush()
+
+    def _queue_update(self, table: str, row_id: int, updates: dict) -> None:
+        updates = self._clean(table, updates)
+        with self._lock:
+            self._updates.setdefault((table, row_id), {}).update(updates)
+            self._pending += 1
+            if updates.get("status") in _TERMINAL_STATUSES:
+                self.flush()
+            else:
+                self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if self._pending >= self.flush_count or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all queued inserts and merged updates in one transaction."""
+        with self._lock:
+            if self._pending:
+                with self._conn:
+                    for sql, rows in self._inserts.items():
+                        self._conn.executemany(sql, rows)
+                    for (table, row_id), updates in self._updates.items():
+                        assignments = ", ".join(f"{name} = ?" for name in updates)
+                        self._conn.execute(
+                            f"UPDATE {table} SET {assignments} WHERE id = ?", (*updates.values(), row_id)
+                        )
+                self.transactions += 1
+            self._inserts = {}
+            self._updates = {}
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def __enter__(self) -> "WorkflowDatabase":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- API mirrored from site/lib/database.ts ---------------------------
+
+    def createPrediction(self, prediction: dict) -> int:
+        prediction = self._with_defaults("predictions", prediction, {
+            "model_path": prediction.get("model_name", ""),
+            "name": Path(str(prediction.get("source_path", "prediction"))).name,
+        })
+        return self._insert_now("predictions", prediction)
+
+    def updatePrediction(self, prediction_id: int, updates: dict) -> None:
+        self._queue_update("predictions", prediction_id, updates)
+
+    def createTrainingSession(self, session: dict) -> int:
+        session = self._with_defaults("training_sessions", session, {
+            "name": Path(str(session.get("dataset_path", "training"))).stem,
+        })
+        return self._insert_now("training_sessions", session)
+
+    def updateTrainingSession(self, session_id: int, updates: dict) -> None:
+        self._queue_update("training_sessions", session_id, updates)
+
+    def logActivity(self, log: dict) -> None:
+        """Queue an ``activity_logs`` row; it is written with the next flush."""
+        self._queue_insert("activity_logs", log)
+
+    def addFileOperations(self, operations: Iterable[dict]) -> int:
+        """Insert many ``file_operations`` rows in a single transaction."""
+        rows_by_sql: dict[str, list[tuple]] = {}
+        count = 0
+        for op in operations:
+            values = self._clean("file_operations", op)
+            names = tuple(values)
+            sql = f"INSERT INTO file_operations ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"
+            rows_by_sql.setdefault(sql, []).append(tuple(values.values()))
+            count += 1
+        with self._lock, self._conn:
+            for sql, rows in rows_by_sql.items():
+                self._conn.executemany(sql, rows)
+            self.transactions += 1
+        return count
@@ -0,0 +1,158 @@
+"""Pre-resized copies of training images.
+
+Training decodes every image again each epoch, which leaves the loop bound
+by JPEG decoding when the dataset holds large stills. A dataset cache holds
+each image of a split resized once so its longer side is ``imgsz`` (the size
+ultralytics resizes to anyway), next to the matching labels, in the
+``images``/``labels`` layout ultralytics expects. :func:`generate_data_yaml`
+points ``train`` and ``val`` at the cache and records it under
+``dataset_cache`` in ``data.yaml``.
+
+Images are resized in parallel. A manifest in the cache directory records
+the content digest of every source image, so a rebuild only re-encodes
+images whose contents changed and removes the copies of deleted ones.
+Images already no larger than ``imgsz`` are linked instead of re-encoded.
+Label coordinates are normalised, so the labels are linked unchanged.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .manifest import Manifest, ManifestEntry
+from .materialize import materialize
+from .sources import IMAGE_EXTENSIONS
+from .utils import emit_status, ensure_dir, file_digest
+
+MANIFEST_NAME = "manifest.sqlite"
+
+
+def label_path(image_path: Path) -> Path:
+    """Return the label file ultralytics reads for ``image_path``."""
+    sa, sb = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    return Path(sb.join(str(image_path).rsplit(sa, 1))).with_suffix(".txt")
+
+
+def _list_images(images_dir: Path) -> list[Path]:
+    return sorted(
+        p.relative_to(images_dir)
+        for p in images_dir.rglob("*")
+        if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file()
+    )
+
+
+def _cache_image(images_dir: Path, cached_images: Path, rel: Path, imgsz: int, quality: int) -> str:
+    """Cache one image; return its path relative to ``cached_images``."""
+    from PIL import Image
+
+    from .prefetch import load_image
+
+    src = images_dir / rel
+    with Image.open(src) as image:
+        small = max(image.size) <= imgsz and image.getexif().get(0x0112, 1) == 1
+    target = rel if small else rel.with_suffix(".jpg")
+    dst = cached_images / target
+    ensure_dir(dst.parent)
+    if small:
+        materialize(src, dst, "hardlink")
+    else:
+        tmp = dst.with_name(f".{dst.name}.tmp")
+        load_image(src, imgsz).save(tmp, format="JPEG", quality=quality)
+        os.replace(tmp, dst)
+    return str(target)
+
+
+def build_dataset_cache(images_dir: str | Path, cache_dir: str | Path, imgsz: int = 640, workers: int = 4,
+                        quality: int = 95) -> dict:
+    """Bring the cache of one split in ``cache_dir`` up to date with ``images_dir``.
+
+    Returns the cached images directory and the number of images encoded,
+    reused and removed.
+    """
+    images_dir = Path(images_dir).resolve()
+    cache_dir = Path(cache_dir)
+    cached_images = cache_dir / "images"
+    ensure_dir(cached_images)
+    emit_status('dataset_cache_start', source=str(images_dir), cache=str(cache_dir), imgsz=imgsz)
+
+    with Manifest(cache_dir / MANIFEST_NAME) as manifest:
+        known = manifest.load()
+        images = _list_images(images_dir)
+        stats = {rel: os.stat(images_dir / rel) for rel in images}
+
+        def digest(rel):
+            entry = known.get(str(rel))
+            st = stats[rel]
+            if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                return entry.digest
+            return file_digest(images_dir / rel)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            digests = dict(zip(images, pool.map(digest, images)))
+            targets = {
+                rel: known[str(rel)].target
+                for rel in images
+                if str(rel) in known
+                and known[str(rel)].digest == digests[rel]
+                and (cached_images / known[str(rel)].target).exists()
+            }
+            todo = [rel for rel in images if rel not in targets]
+            futures = {
+                rel: pool.submit(_cache_image, images_dir, cached_images, rel, imgsz, quality) for rel in todo
+            }
+            failed = set()
+            for rel, future in futures.items():
+                try:
+                    targets[rel] = future.result()
+                except Exception as e:
+                    logging.warning(f"Could not cache {images_dir / rel}: {e}")
+                    failed.add(rel)
+                    continue
+                emit_status('dataset_cached', file=str(rel))
+
+        current = {str(rel): targets.get(rel) for rel in images}
+        removed = [path for path in known if path not in current]
+        for path, entry in known.items():
+            if current.get(path) == entry.target:
+                continue
+            # Deleted, failed, or now cached under another name.
+            for stale in (cached_images / entry.target, label_path(cached_images / entry.target)):
+                if stale.exists():
+                    stale.unlink()
+
+        for rel, cached in targets.items():
+            src_label = label_path(images_dir / rel)
+            dst_label = label_path(cached_images / cached)
+            if src_label.exists():
+                ensure_dir(dst_label.parent)
+                materialize(src_label, dst_label, "hardlink")
+            elif dst_label.exists():
+                dst_label.unlink()
+
+        manifest.remove(removed + [str(rel) for rel in failed])
+        manifest.update(
+            ManifestEntry(str(rel), stats[rel].st_size, stats[rel].st_mtime_ns, digests[rel], cached)
+            for rel, cached in targets.items()
+        )
+
+    result = {
+        "images": str(cached_images),
+        "encoded": len(todo) - len(failed),
+        "reused": len(images) - len(todo),
+        "removed": len(removed),
+        "failed": len(failed),
+    }
+    emit_status('dataset_cache_complete', **result)
+    return result
+
+
+def check_cache_size(data_yaml: str | Path, imgsz: int) -> None:
+    """Warn when training at a larger ``imgsz`` than the dataset cache of ``data_yaml`` holds."""
+    import yaml
+
+    with open(data_yaml, "r") as f:
+        cache = (yaml.safe_load(f) or {}).get("dataset_cache")
+    if cache and cache.get("imgsz", imgsz) < imgsz:
+        logging.warning(f"Dataset cache holds {cache['imgsz']}px images but training uses imgsz={imgsz}")
+        emit_status('warning', message=f"dataset cache imgsz {cache['imgsz']} < training imgsz {imgsz}")
@@ -0,0 +1,304 @@
+"""Persistent, queryable index of the detections written by prediction runs.
+
+Every ``predict*`` directory under a source directory becomes a run. Each
+detection in its ``labels/*.txt`` files (or its result store, see
+:mod:`backend.result_store`) is stored as one row (run, frame,
+class, confidence and box) in a SQLite database, so questions such as
+"frames with class X above confidence Y in video Z" are answered from
+indexes instead of by re-reading label files. Re-indexing only parses label
+files that are new or whose size or modification time changed.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from .labels import STORE_NAME, frame_number, label_stem, read_label_file
+from .sources import is_video
+from .utils import emit_status, ensure_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    video TEXT
+);
+
+CREATE TABLE IF NOT EXISTS label_files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    frame INTEGER,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    UNIQUE (run_id, name),
+    FOREIGN KEY (run_id) REFERENCES runs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS detections (
+    file_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    frame INTEGER,
+    class_id INTEGER NOT NULL,
+    confidence REAL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    w REAL NOT NULL,
+    h REAL NOT NULL,
+    FOREIGN KEY (file_id) REFERENCES label_files (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_detections_class_conf ON detections(class_id, confidence);
+CREATE INDEX IF NOT EXISTS idx_detections_run_class ON detections(run_id, class_id, confidence);
+CREATE INDEX IF NOT EXISTS idx_detections_file ON detections(file_id);
+CREATE INDEX IF NOT EXISTS idx_runs_video ON runs(video);
+"""
+
+
+def connect(db_path: str | Path) -> sqlite3.Connection:
+    """Open (and create if needed) the detection index at ``db_path``."""
+    ensure_dir(Path(db_path).parent)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def find_video(predict_dir: str) -> str | None:
+    """Return the name of the first ``.avi`` file in ``predict_dir``."""
+    with os.scandir(predict_dir) as it:
+        return next((e.name for e in it if e.name.endswith('.avi')), None)
+
+
+def run_video(predict_dir: str) -> str | None:
+    """Return the video name of a run: the rendered ``.avi`` or the store's first video source."""
+    video_file = find_video(predict_dir)
+    if video_file is None:
+        store = os.path.join(predict_dir, STORE_NAME)
+        if os.path.exists(store):
+            from .result_store import ResultStore
+
+            video_file = next((Path(s).name for s in ResultStore(store).source_paths() if is_video(s)), None)
+    return video_file
+
+
+def run_dirs(source_dir: str | Path) -> list[Path]:
+    """Return the ``predict*`` directories holding labels or a result store."""
+    root = Path(source_dir)
+    dirs = {d.parent for d in root.glob('predict*/labels')} | {f.parent for f in root.glob(f'predict*/{STORE_NAME}')}
+    return sorted(dirs)
+
+
+def _index_store(conn: sqlite3.Connection, run_id: int, store_path: str, known: dict) -> tuple[int, int]:
+    """Index a result store; its frames become label file rows sharing the store's stat."""
+    st = os.stat(store_path)
+    if known and all(v[1:] == (st.st_size, st.st_mtime_ns) for v in known.values()):
+        return 0, 0
+    from .result_store import ResultStore
+
+    conn.execute("DELETE FROM label_files WHERE run_id = ?", (run_id,))
+    parsed = 0
+    for source, frame, rows in ResultStore(store_path).iter_frames():
+        file_id = conn.execute(
+            "INSERT INTO label_files (run_id, name, frame, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+            (run_id, label_stem(Path(source).stem, frame) + '.txt', frame, st.st_size, st.st_mtime_ns),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO detections (file_id, run_id, frame, class_id, confidence, x, y, w, h) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(file_id, run_id, frame, cls_id, conf, x, y, w, h) for cls_id, x, y, w, h, conf in rows],
+        )
+        parsed += 1
+    return parsed, len(known)
+
+
+def _index_run(conn: sqlite3.Connection, predict_dir: str) -> tuple[int, int]:
+    """Bring one ``predict*`` run up to date; return (files parsed, files removed)."""
+    name = os.path.basename(predict_dir)
+    video_file = run_video(predict_dir)
+    video = os.path.join(name, video_file) if video_file else None
+
+    conn.execute("INSERT INTO runs (name, video) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET video = excluded.video", (name, video))
+    run_id = conn.execute("SELECT id FROM runs WHERE name = ?", (name,)).fetchone()[0]
+    known = {
+        row[0]: (row[1], row[2], row[3])
+        for row in conn.execute("SELECT name, id, size, mtime_ns FROM label_files WHERE run_id = ?", (run_id,))
+    }
+
+    store_path = os.path.join(predict_dir, STORE_NAME)
+    if os.path.exists(store_path):
+        return _index_store(conn, run_id, store_path, known)
+
+    labels_dir = os.path.join(predict_dir, 'labels')
+    parsed = 0
+    present = set()
+    with os.scandir(labels_dir) as it:
+        for entry in it:
+            if not entry.name.endswith('.txt') or not entry.is_file():
+                continue
+            present.add(entry.name)
+            st = entry.stat()
+            previous = known.get(entry.name)
+            if previous is not None and previous[1:] == (st.st_size, st.st_mtime_ns):
+                continue
+            if previous is not None:
+                conn.execute("DELETE FROM label_files WHERE id = ?", (previous[0],))
+
+            frame = frame_number(os.path.splitext(entry.name)[0])
+            file_id = conn.execute(
+                "INSERT INTO label_files (run_id, name, frame, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                (run_id, entry.name, frame, st.st_size, st.st_mtime_ns),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO detections (file_id, run_id, frame, class_id, confidence, x, y, w, h) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(file_id, run_id, frame, cls_id, conf, x, y, w, h)
+                 for cls_id, x, y, w, h, conf in read_label_file(entry.path)],
+            )
+            parsed += 1
+
+    removed = [(known[n][0],) for n in known if n not in present]
+    conn.executemany("DELETE FROM label_files WHERE id = ?", removed)
+    return parsed, len(removed)
+
+
+def update_detection_index(source_dir: str | Path, db_path: str | Path, class_map: dict[int, str] | None = None) -> dict:
+    """Index every ``predict*`` run under ``source_dir``."""
+    conn = connect(db_path)
+    totals = {'runs': 0, 'parsed': 0, 'removed': 0}
+    try:
+        if class_map:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO classes (id, name) VALUES (?, ?)", class_map.items())
+        predict_dirs = run_dirs(source_dir)
+        current = {d.name for d in predict_dirs}
+        with conn:
+            stale = [(name,) for (name,) in conn.execute("SELECT name FROM runs") if name not in current]
+            conn.executemany("DELETE FROM runs WHERE name = ?", stale)
+        for predict_dir in predict_dirs:
+            with conn:
+                parsed, removed = _index_run(conn, str(predict_dir))
+            totals['runs'] += 1
+            totals['parsed'] += parsed
+            totals['removed'] += removed
+            emit_status('indexed_run', run=predict_dir.name, parsed=parsed, removed=removed)
+    finally:
+        conn.close()
+    return totals
+
+
+def _resolve_class(conn: sqlite3.Connection, cls) -> int | None:
+    if isinstance(cls, int) or (isinstance(cls, str) and cls.isdigit()):
+        return int(cls)
+    row = conn.execute("SELECT id FROM classes WHERE name = ?", (cls,)).fetchone()
+    return row[0] if row else None
+
+
+def query_frames(db_path: str | Path, cls, min_conf: float = 0.0, video: str | None = None,
+                 limit: int | None = None) -> list[dict]:
+    """Return the frames containing ``cls`` with at least ``min_conf`` confidence.
+
+    ``cls`` may be a class id or a class name known from the indexed class
+    map, and ``video`` restricts results to one run's video (as stored in the
+    JSON index, e.g. ``predict3/clip.avi``). Detections saved without a
+    confidence only match when ``min_conf`` is ``0``.
+    """
+    conn = connect(db_path)
+    try:
+        class_id = _resolve_class(conn, cls)
+        if class_id is None:
+            return []
+        sql = (
+            "SELECT r.video, r.name, f.name, d.frame, MAX(d.confidence), COUNT(*) "
+            "FROM detections d JOIN label_files f ON f.id = d.file_id JOIN runs r ON r.id = d.run_id "
+            "WHERE d.class_id = ?"
+        )
+        params: list = [class_id]
+        if min_conf > 0:
+            sql += " AND d.confidence >= ?"
+            params.append(min_conf)
+        if video is not None:
+            sql += " AND d.run_id IN (SELECT id FROM runs WHERE video = ?)"
+            params.append(video)
+        sql += " GROUP BY d.file_id ORDER BY r.name, d.frame"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [
+            {
+                "video": video_path,
+                "frame_label": os.path.join(run, 'labels', label),
+                "frame": frame,
+                "max_confidence": max_conf,
+                "detections": count,
+            }
+            for video_path, run, label, frame, max_conf, count in conn.execute(sql, params)
+        ]
+    finally:
+        conn.close()
+
+
+def iter_frame_classes(db_path: str | Path):
+    """Yield ``(run, video, label name, class ids)`` for every indexed label file."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT r.name, r.video, f.name, GROUP_CONCAT(DISTINCT d.class_id) "
+            "FROM label_files f JOIN runs r ON r.id = f.run_id JOIN detections d ON d.file_id = f.id "
+            "GROUP BY f.id ORDER BY r.name, f.name"
+        )
+        for run, video, label, class_ids in rows:
+            yield run, video, label, [int(c) for c in class_ids.split(',')]
+    finally:
+        conn.close()
+
+
+def build_detection_index(cfg):
+    source_dir = cfg['source_dir']
+    db_path = cfg['index_db']
+    class_map = None
+    if cfg.get('class_map'):
+        with open(cfg['class_map'], 'r') as f:
+            class_map = {int(k): v for k, v in json.load(f).items()}
+
+    emit_status('start', action='detection_index', source=str(source_dir))
+    totals = update_detection_index(source_dir, db_path, class_map)
+    emit_status('complete', action='detection_index', output=str(db_path), **totals)
+    return totals
+
+
+def run(config_path: str) -> None:
+    """Update the index and, if the config has a ``query`` section, print its results."""
+    with open(config_path, "r") as f:
+        cfg = json.load(f)
+    build_detection_index(cfg)
+    query = cfg.get('query')
+    if query:
+        results = query_frames(
+            cfg['index_db'],
+            query['class'],
+            min_conf=query.get('min_conf', 0.0),
+            video=query.get('video'),
+            limit=query.get('limit'),
+        )
+        print(json.dumps(results, indent=2))
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = argv or sys.argv[1:]
+    if len(argv) != 1:
+        print("Usage: python -m backend.detection_index <config.json>")
+        sys.exit(1)
+    run(argv[0])
+
+
+if __name__ == "__main__":
+    main()
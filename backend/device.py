@@ -0,0 +1,22 @@
+"""Choosing the device models run on."""
+
+import logging
+
+
+def resolve_device(setting=None):
+    """Return the device for a ``device`` config value.
+
+    Explicit values (``0``, ``"0,1"``, ``"cpu"``, ...) are returned unchanged.
+    ``None`` or ``"auto"`` selects the first CUDA device when torch can see
+    one and the CPU otherwise.
+    """
+    if setting not in (None, "auto"):
+        return setting
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return 0
+    logging.info("No CUDA device available, using the CPU")
+    return "cpu"
@@ -1,18 +1,24 @@
 import os
 import sys
 import json
-import shutil
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from .utils import emit_status
+from .materialize import materialize
+from .utils import emit_status, index_by_stem
 
 
 def ensure_dir(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
-def copy_matching_images(labels_dir, images_dir, output_dir):
+_IMAGE_EXTS = ('.jpg', '.jpeg')
+_PROGRESS_INTERVAL = 1.0
+
+
+def copy_matching_images(labels_dir, images_dir, output_dir, mode="copy", workers=1):
     labels_dir = Path(labels_dir)
     images_dir = Path(images_dir)
     output_images = Path(output_dir) / "images"
@@ -26,22 +32,36 @@ def copy_matching_images(labels_dir, images_dir, output_dir):
     missing = 0
     renamed = 0
 
-    emit_status('start', action='download_annotated', labels=len(label_files))
-
-    for label_file in label_files:
-        original_stem = label_file.stem
-        base = original_stem.split("__", 1)[1] if "__" in original_stem else original_stem
-
-        candidates = list(images_dir.glob(f"{base}.*"))
-        img_file = next((c for c in candidates if c.suffix.lower() in ['.jpg', '.jpeg']), None)
-
-        if img_file and img_file.exists():
-            new_label_name = img_file.stem + ".txt"
-            new_label_path = output_labels / new_label_name
-
-            shutil.copy(img_file, output_images / img_file.name)
-            shutil.copy(label_file, new_label_path)
-
+    emit_status('start', action='download_annotated', labels=len(label_files), workers=workers)
+    stem_index = index_by_stem(images_dir, _IMAGE_EXTS)
+
+    def _copy(label_file, img_file):
+        new_label_name = img_file.stem + ".txt"
+        materialize(img_file, output_images / img_file.name, mode)
+        materialize(label_file, output_labels / new_label_name, mode)
+        return label_file, img_file, new_label_name
+
+    started = time.monotonic()
+    last_report = started
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = []
+        for label_file in label_files:
+            original_stem = label_file.stem
+            base = original_stem.split("__", 1)[1] if "__" in original_stem else original_stem
+
+            img_file = stem_index.get(base)
+            if img_file is None:
+                logging.warning(f"[MISSING] No image found for label {label_file.name}")
+                missing += 1
+                done += 1
+                emit_status('missing', label=str(label_file))
+                continue
+            futures.append(pool.submit(_copy, label_file, img_file))
+
+        for future in as_completed(futures):
+            label_file, img_file, new_label_name = future.result()
             log_entry = f"[COPY] {img_file.name} and {new_label_name}"
             if new_label_name != label_file.name:
                 renamed += 1
@@ -49,13 +69,30 @@ def copy_matching_images(labels_dir, images_dir, output_dir):
 
             logging.info(log_entry)
             count += 1
+            done += 1
             emit_status('copied', image=str(img_file), label=new_label_name)
-        else:
-            logging.warning(f"[MISSING] No image found for label {label_file.name}")
-            missing += 1
-            emit_status('missing', label=str(label_file))
 
-    emit_status('complete', action='download_annotated', copied=count, renamed=renamed, missing=missing)
+            now = time.monotonic()
+            if now - last_report >= _PROGRESS_INTERVAL:
+                last_report = now
+                emit_status(
+                    'progress',
+                    action='download_annotated',
+                    done=done,
+                    total=len(label_files),
+                    files_per_sec=round(count / (now - started), 1),
+                )
+
+    elapsed = time.monotonic() - started
+    emit_status(
+        'complete',
+        action='download_annotated',
+        copied=count,
+        renamed=renamed,
+        missing=missing,
+        elapsed=round(elapsed, 3),
+        files_per_sec=round(count / elapsed, 1) if elapsed > 0 else None,
+    )
     return {
         'copied': count,
         'renamed': renamed,
@@ -67,7 +104,9 @@ def download_annotated(cfg):
     labels_dir = cfg.get("labels_dir")
     images_dir = cfg.get("images_dir")
     output_dir = cfg.get("output_dir")
-    return copy_matching_images(labels_dir, images_dir, output_dir)
+    mode = cfg.get("materialize", "copy")
+    workers = int(cfg.get("workers", 1))
+    return copy_matching_images(labels_dir, images_dir, output_dir, mode=mode, workers=workers)
 
 
 def setup_logging(log_dir: Path) -> Path:
@@ -0,0 +1,174 @@
+"""Status event bus shared by all backend steps.
+
+:func:`backend.utils.emit_status` publishes every event here. In-process
+subscribers receive every event, optionally only those of one job (see
+:meth:`EventBus.job`). The machine-readable output written by
+:class:`StatusSink` is cheaper: high-frequency per-file events such as
+``prediction`` or ``copied`` are counted and folded into a periodic
+``summary`` event instead of being serialised and flushed one by one.
+
+The output goes to stdout unless ``WORKFLOW_STATUS_FD`` names an inherited
+file descriptor, which keeps it apart from the text that ultralytics and
+other libraries print. ``WORKFLOW_STATUS_INTERVAL`` sets the summary period
+in seconds (default ``0.5``); ``0`` writes every event as it happens.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+StatusCallback = Callable[[str, dict], None]
+
+# Per-file events that are folded into ``summary`` events in the output.
+COALESCED_EVENTS = frozenset({
+    "prediction",
+    "copied",
+    "overwritten",
+    "skipped",
+    "renamed",
+    "deleted",
+    "missing",
+    "indexed",
+    "converted",
+    "staged",
+    "missing_image",
+    "frame_skipped",
+    "missing_frame",
+    "dataset_cached",
+    "uploaded",
+    "would_upload",
+    "would_delete",
+})
+
+_current_job: contextvars.ContextVar[Any] = contextvars.ContextVar("status_job", default=None)
+
+
+class StatusSink:
+    """Write events as NDJSON lines, coalescing high-frequency events.
+
+    Coalesced events are counted per job and written as one ``summary``
+    event (with the counts and the most recent payload) at most every
+    ``interval`` seconds. Any other event first flushes the pending
+    summaries, so the output keeps its order around ``start``/``complete``.
+    """
+
+    def __init__(self, stream=None, interval: float = 0.5, coalesced=COALESCED_EVENTS):
+        self._stream = stream
+        self.interval = interval
+        self.coalesced = coalesced
+        self._pending: dict[Any, dict] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _write(self, payload: dict) -> None:
+        # stdout is looked up on every write so redirection keeps working.
+        stream = self._stream or sys.stdout
+        stream.write(json.dumps(payload) + "\n")
+        stream.flush()
+
+    def _flush_pending(self) -> None:
+        for job, pending in self._pending.items():
+            event, data = pending["last"]
+            payload = {"event": "summary", "counts": pending["counts"], "last": {"event": event, **data}}
+            if job is not None:
+                payload["job"] = job
+            self._write(payload)
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def write(self, event: str, data: dict, job: Any = None) -> None:
+        with self._lock:
+            if self.interval > 0 and event in self.coalesced:
+                pending = self._pending.setdefault(job, {"counts": {}, "last": None})
+                pending["counts"][event] = pending["counts"].get(event, 0) + 1
+                pending["last"] = (event, data)
+                if time.monotonic() - self._last_flush >= self.interval:
+                    self._flush_pending()
+                return
+            if self._pending:
+                self._flush_pending()
+            payload = {"event": event, **data}
+            if job is not None:
+                payload["job"] = job
+            self._write(payload)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._flush_pending()
+
+
+class EventBus:
+    """Fan status events out to an output sink and in-process subscribers."""
+
+    def __init__(self, sink: Optional[StatusSink] = None):
+        self.sink = sink
+        self._subscribers: tuple[tuple[StatusCallback, Any], ...] = ()
+        self._callback: Optional[StatusCallback] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, cb: StatusCallback, job: Any = None) -> tuple:
+        """Register ``cb`` for all events, or only those of ``job``."""
+        handle = (cb, job)
+        with self._lock:
+            self._subscribers = self._subscribers + (handle,)
+        return handle
+
+    def unsubscribe(self, handle: tuple) -> None:
+        with self._lock:
+            subs = list(self._subscribers)
+            subs.remove(handle)
+            self._subscribers = tuple(subs)
+
+    @contextmanager
+    def subscription(self, cb: StatusCallback, job: Any = None) -> Iterator[None]:
+        handle = self.subscribe(cb, job)
+        try:
+            yield
+        finally:
+            self.unsubscribe(handle)
+
+    @contextmanager
+    def job(self, job_id: Any) -> Iterator[None]:
+        """Tag events published in this context with ``job_id``."""
+        token = _current_job.set(job_id)
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+
+    def set_callback(self, cb: Optional[StatusCallback]) -> None:
+        """Set the single global callback used by ``set_status_callback``."""
+        self._callback = cb
+
+    def publish(self, event: str, data: dict) -> None:
+        job = _current_job.get()
+        if self.sink is not None:
+            self.sink.write(event, data, job)
+        if self._callback is not None:
+            self._callback(event, data)
+        for cb, scope in self._subscribers:
+            if scope is None or scope == job:
+                cb(event, data)
+
+
+def _default_sink() -> StatusSink:
+    interval = float(os.getenv("WORKFLOW_STATUS_INTERVAL", "0.5"))
+    stream = None
+    fd = os.getenv("WORKFLOW_STATUS_FD")
+    if fd:
+        try:
+            stream = os.fdopen(int(fd), "w", buffering=1)
+        except (OSError, ValueError):
+            stream = None
+    return StatusSink(stream=stream, interval=interval)
+
+
+bus = EventBus(_default_sink())
+atexit.register(bus.sink.flush)
@@ -10,6 +10,26 @@ import yaml
 from .utils import emit_status, ensure_dir
 
 
+def _build_cache(cache, output_path, train_path, val_path):
+    """Build the dataset cache of both splits; return the cached train and val dirs and its record."""
+    from .dataset_cache import build_dataset_cache
+
+    options = cache if isinstance(cache, dict) else {}
+    imgsz = options.get("imgsz", 640)
+    cache_dir = Path(options.get("dir") or output_path.parent / "dataset_cache").resolve() / str(imgsz)
+    workers = options.get("workers", os.cpu_count() or 1)
+    quality = options.get("quality", 95)
+    train = build_dataset_cache(train_path, cache_dir / "train", imgsz, workers, quality)
+    val = build_dataset_cache(val_path, cache_dir / "val", imgsz, workers, quality)
+    record = {
+        "dir": str(cache_dir),
+        "imgsz": imgsz,
+        "train": str(train_path.resolve()),
+        "val": str(val_path.resolve()),
+    }
+    return train["images"], val["images"], record
+
+
 def generate_data_yaml(cfg):
     classes_path = Path(cfg["classes_file"])
     output_path = Path(cfg["output_file"])
@@ -33,6 +53,10 @@ def generate_data_yaml(cfg):
         "names": classes,
     }
 
+    cache = cfg.get("dataset_cache")
+    if cache:
+        data["train"], data["val"], data["dataset_cache"] = _build_cache(cache, output_path, train_path, val_path)
+
     ensure_dir(output_path.parent)
     with open(output_path, "w") as f:
         yaml.dump(data, f, sort_keys=False)
@@ -0,0 +1,152 @@
+"""Read image dimensions from file headers without decoding pixel data."""
+
+import os
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+
+from .utils import ensure_dir
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carrying the frame size (excludes DHT, JPG and DAC).
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# EXIF orientations that rotate the image by 90 degrees.
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _exif_orientation(segment: bytes) -> int:
+    """Return the EXIF orientation stored in an APP1 segment, or ``1``."""
+    if not segment.startswith(b"Exif\x00\x00"):
+        return 1
+    tiff = segment[6:]
+    if len(tiff) < 8:
+        return 1
+    endian = "<" if tiff[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+    if ifd_offset + 2 > len(tiff):
+        return 1
+    (count,) = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        if entry + 12 > len(tiff):
+            break
+        tag, _typ, _n = struct.unpack(endian + "HHI", tiff[entry:entry + 8])
+        if tag == 0x0112:
+            return struct.unpack(endian + "H", tiff[entry + 8:entry + 10])[0]
+    return 1
+
+
+def _read(f, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("truncated JPEG header")
+    return data
+
+
+def _jpeg_size(f) -> tuple[int, int]:
+    orientation = 1
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            raise ValueError("no SOF marker found")
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker == 0xD9:
+            raise ValueError("no SOF marker found")
+        (length,) = struct.unpack(">H", _read(f, 2))
+        if length < 2:
+            raise ValueError("invalid JPEG segment length")
+        if marker in _SOF_MARKERS:
+            _precision, height, width = struct.unpack(">BHH", _read(f, 5))
+            if orientation in _TRANSPOSED_ORIENTATIONS:
+                return height, width
+            return width, height
+        if marker == 0xE1:
+            orientation = _exif_orientation(_read(f, length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path: str | Path) -> tuple[int, int]:
+    """Return ``(width, height)`` of a JPEG or PNG image from its header.
+
+    Only the bytes up to the JPEG start-of-frame segment (or the PNG ``IHDR``
+    chunk) are read. JPEG EXIF orientation is honoured, so rotated camera
+    images report their displayed size. Raises ``ValueError`` for formats
+    that cannot be parsed.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head.startswith(_PNG_SIGNATURE) and head[12:16] == b"IHDR" and len(head) == 24:
+            return struct.unpack(">II", head[16:24])
+        if head[:2] == b"\xff\xd8":
+            return _jpeg_size(f)
+    raise ValueError(f"Unsupported image format: {path}")
+
+
+def default_cache_path() -> Path:
+    data_dir = Path(os.getenv("DATA_DIR", "."))
+    return data_dir / "cache" / "image_sizes.sqlite"
+
+
+class ImageSizeCache:
+    """Persistent ``(width, height)`` cache keyed by path, size and mtime."""
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else default_cache_path()
+        ensure_dir(self.path.parent)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sizes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def size_of(self, path: str | Path) -> tuple[int, int]:
+        """Return the dimensions of ``path``, probing the header on a miss."""
+        key = str(Path(path).resolve())
+        st = os.stat(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT width, height FROM sizes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (key, st.st_size, st.st_mtime_ns),
+            ).fetchone()
+        if row is not None:
+            return row[0], row[1]
+        width, height = read_image_size(key)
+        with self._lock:
+            self._pending.append((key, st.st_size, st.st_mtime_ns, width, height))
+        return width, height
+
+    def flush(self) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO sizes VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ImageSizeCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
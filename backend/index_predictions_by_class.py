@@ -2,8 +2,14 @@ import os
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from glob import glob
+from .detection_index import iter_frame_classes, run_video, update_detection_index
+from .labels import STORE_NAME, label_stem
 from .utils import emit_status
+from .writers import open_record_writer
+
+_BATCH_SIZE = 512
 
 
 def load_class_map(path):
@@ -11,14 +17,69 @@ def load_class_map(path):
         return {int(k): v for k, v in json.load(f).items()}
 
 
-def parse_txt_file(path):
-    class_ids = set()
-    with open(path, 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if parts:
-                class_ids.add(int(parts[0]))
-    return list(class_ids)
+def parse_label_batch(paths):
+    """Return the sorted class ids found in each label file of ``paths``.
+
+    Each file is read in one call and only the first token of every line is
+    converted, which keeps per-file overhead low for the many tiny label files
+    a video run produces.
+    """
+    results = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        results.append(sorted({int(line.split(None, 1)[0]) for line in data.splitlines() if line.strip()}))
+    return results
+
+
+def _collect_label_files(root_dir):
+    """Return ``(video, frame_label)`` pairs and label paths in a fixed order.
+
+    Runs with a result store are left to :func:`_iter_store_frames`.
+    """
+    frames, paths = [], []
+    for labels_dir in sorted(glob(os.path.join(root_dir, 'predict*/labels'))):
+        predict_dir = os.path.dirname(labels_dir)
+        if os.path.exists(os.path.join(predict_dir, STORE_NAME)):
+            continue
+        video_file = run_video(predict_dir)
+        if not video_file:
+            continue
+
+        run_name = os.path.basename(predict_dir)
+        full_video_path = os.path.join(run_name, video_file)
+        with os.scandir(labels_dir) as it:
+            names = sorted(e.name for e in it if e.name.endswith('.txt'))
+        for name in names:
+            frames.append((full_video_path, os.path.join(run_name, 'labels', name)))
+            paths.append(os.path.join(labels_dir, name))
+    return frames, paths
+
+
+def _iter_store_frames(root_dir):
+    """Yield ``(video, frame_label, class_ids)`` for runs with a result store."""
+    for store_path in sorted(glob(os.path.join(root_dir, f'predict*/{STORE_NAME}'))):
+        from .result_store import ResultStore
+
+        predict_dir = os.path.dirname(store_path)
+        video_file = run_video(predict_dir)
+        if not video_file:
+            continue
+        run_name = os.path.basename(predict_dir)
+        full_video_path = os.path.join(run_name, video_file)
+        for source, frame, class_ids in ResultStore(store_path).iter_frame_classes():
+            label = label_stem(os.path.splitext(os.path.basename(source))[0], frame) + '.txt'
+            yield full_video_path, os.path.join(run_name, 'labels', label), class_ids
+
+
+def _merge(frames, batch_results, add):
+    """Feed parsed batches to ``add`` in the order the files were collected."""
+    position = 0
+    for batch in batch_results:
+        for class_ids in batch:
+            video_path, frame_label = frames[position]
+            add(video_path, frame_label, class_ids)
+            position += 1
 
 
 def index_predictions(cfg):
@@ -26,6 +87,8 @@ def index_predictions(cfg):
     output_path = cfg['output_json']
     class_map_path = cfg['class_map']
     filter_class = cfg.get('filter_class')
+    workers = int(cfg.get('workers', 1))
+    batch_size = int(cfg.get('batch_size', _BATCH_SIZE))
 
     emit_status('start', action='index_predictions')
 
@@ -33,37 +96,51 @@ def index_predictions(cfg):
     reverse_class_map = {v: k for k, v in class_map.items()}
     class_filter_id = reverse_class_map.get(filter_class) if filter_class else None
 
-    index = []
-
-    for labels_dir in glob(os.path.join(root_dir, 'predict*/labels')):
-        predict_dir = os.path.dirname(labels_dir)
-        video_file = next((f for f in os.listdir(predict_dir) if f.endswith('.avi')), None)
-        if not video_file:
-            continue
-
-        full_video_path = os.path.join(os.path.basename(predict_dir), video_file)
-
-        for txt_file in glob(os.path.join(labels_dir, '*.txt')):
-            class_ids = parse_txt_file(txt_file)
-            if not class_ids:
-                continue
-            if class_filter_id is not None and class_filter_id not in class_ids:
-                continue
-
-            entry = {
-                "video": full_video_path,
-                "frame_label": os.path.join(os.path.basename(predict_dir), 'labels', os.path.basename(txt_file)),
-                "class_ids": class_ids,
-                "class_names": [class_map[cid] for cid in class_ids if cid in class_map],
-            }
+    stream = cfg.get('stream', False)
+    index = None if stream else []
+    writer = open_record_writer(output_path, cfg.get('output_format'), cfg.get('gzip'))
+
+    def _add(video_path, frame_label, class_ids):
+        if not class_ids:
+            return
+        if class_filter_id is not None and class_filter_id not in class_ids:
+            return
+        entry = {
+            "video": video_path,
+            "frame_label": frame_label,
+            "class_ids": class_ids,
+            "class_names": [class_map[cid] for cid in class_ids if cid in class_map],
+        }
+        writer.write(entry)
+        if index is not None:
             index.append(entry)
-            emit_status('indexed', file=os.path.basename(txt_file), classes=entry["class_names"])
-
-    with open(output_path, 'w') as f:
-        json.dump(index, f, indent=2)
-
-    emit_status('complete', action='index_predictions', entries=len(index), output=output_path)
-    return index
+        emit_status('indexed', file=os.path.basename(frame_label), classes=entry["class_names"])
+
+    index_db = cfg.get('index_db')
+    try:
+        if index_db:
+            # Only new or changed label files are parsed; the JSON entries are
+            # then produced from the detection index.
+            update_detection_index(root_dir, index_db, class_map)
+            for run_name, video_path, label_name, class_ids in iter_frame_classes(index_db):
+                if video_path:
+                    _add(video_path, os.path.join(run_name, 'labels', label_name), class_ids)
+        else:
+            frames, paths = _collect_label_files(root_dir)
+            batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+            if workers > 1 and len(batches) > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = pool.map(parse_label_batch, batches)
+                    _merge(frames, results, _add)
+            else:
+                _merge(frames, map(parse_label_batch, batches), _add)
+            for video_path, frame_label, class_ids in _iter_store_frames(root_dir):
+                _add(video_path, frame_label, class_ids)
+    finally:
+        writer.close()
+
+    emit_status('complete', action='index_predictions', entries=writer.count, output=output_path)
+    return index if index is not None else writer.count
 
 
 def run(config_path: str) -> None:
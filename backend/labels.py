@@ -0,0 +1,82 @@
+"""Reading and writing YOLO label files."""
+
+from pathlib import Path
+from typing import Optional
+
+# File name of a run's result store (see :mod:`backend.result_store`).
+STORE_NAME = "detections.dets"
+
+# (class_id, x_center, y_center, width, height, confidence) with normalised
+# coordinates; ``confidence`` is ``None`` when the file has no sixth column.
+LabelRow = tuple[int, float, float, float, float, Optional[float]]
+
+
+def parse_label_text(text: str) -> list[LabelRow]:
+    """Parse the contents of a YOLO label file, skipping malformed lines."""
+    rows = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) not in (5, 6):
+            continue
+        conf = float(parts[5]) if len(parts) == 6 else None
+        rows.append((int(float(parts[0])), float(parts[1]), float(parts[2]), float(parts[3]), float(parts[4]), conf))
+    return rows
+
+
+def read_label_file(path: str | Path) -> list[LabelRow]:
+    with open(path, "r") as f:
+        return parse_label_text(f.read())
+
+
+def format_label_row(row, save_conf: bool = False) -> str:
+    """Format one row the way ultralytics writes ``save_txt`` labels."""
+    values = [row[0], *row[1:5]]
+    if save_conf and len(row) > 5 and row[5] is not None:
+        values.append(row[5])
+    return ("%g " * len(values)).rstrip() % tuple(values)
+
+
+def write_label_file(path: str | Path, rows, save_conf: bool = False) -> None:
+    with open(path, "w") as f:
+        f.writelines(format_label_row(row, save_conf) + "\n" for row in rows)
+
+
+def label_stem(stem: str, frame: Optional[int] = None) -> str:
+    """Return the label file stem ultralytics uses for an image or video frame."""
+    return f"{stem}_{frame}" if frame else stem
+
+
+class LabelDirWriter:
+    """Write label rows as one ``save_txt``-style file per image or frame.
+
+    Images and frames without detections get no file, as with ultralytics.
+    """
+
+    def __init__(self, labels_dir: str | Path, save_conf: bool = False):
+        self.labels_dir = Path(labels_dir)
+        self.labels_dir.mkdir(parents=True, exist_ok=True)
+        self.save_conf = save_conf
+
+    def add(self, source: str | Path, frame: Optional[int], rows) -> None:
+        if rows:
+            name = label_stem(Path(source).stem, frame) + ".txt"
+            write_label_file(self.labels_dir / name, rows, self.save_conf)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "LabelDirWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def frame_number(stem: str) -> Optional[int]:
+    """Return the frame number of a video label stem such as ``clip_42``.
+
+    Ultralytics names per-frame labels ``<video stem>_<frame>``; ``None`` is
+    returned for stems without a numeric suffix.
+    """
+    _, sep, tail = stem.rpartition("_")
+    return int(tail) if sep and tail.isdigit() else None
@@ -0,0 +1,96 @@
+"""Persistent file manifests used to make repeated runs incremental."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterable
+
+from .utils import ensure_dir
+
+ManifestEntry = namedtuple("ManifestEntry", ["path", "size", "mtime_ns", "digest", "target"])
+
+
+def default_manifest_path(kind: str, key: str | Path) -> Path:
+    """Return the manifest location under ``DATA_DIR`` for ``kind`` and ``key``.
+
+    ``key`` is usually the destination directory (or URL) of the run, so
+    every destination gets its own manifest file.
+    """
+    data_dir = Path(os.getenv("DATA_DIR", "."))
+    # URLs such as ``gs://bucket/prefix`` are used as they are.
+    key = str(key) if "://" in str(key) else str(Path(key).resolve())
+    token = hashlib.sha1(key.encode()).hexdigest()[:12]
+    return data_dir / "manifests" / f"{kind}_{token}.sqlite"
+
+
+def resolve_manifest_path(value, kind: str, key: str | Path) -> Path | None:
+    """Interpret a ``manifest`` config value.
+
+    ``True`` selects :func:`default_manifest_path`, a string is used as the
+    manifest path and any false value disables the manifest.
+    """
+    if not value:
+        return None
+    if value is True:
+        return default_manifest_path(kind, key)
+    return Path(value)
+
+
+class Manifest:
+    """SQLite-backed record of the files handled by previous runs.
+
+    Each entry stores the source path, its size and modification time, a
+    content digest and the name or key it was written to.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        ensure_dir(self.path.parent)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT,
+                target TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def load(self) -> dict[str, ManifestEntry]:
+        """Return every entry keyed by source path."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, size, mtime_ns, digest, target FROM entries").fetchall()
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def update(self, entries: Iterable[ManifestEntry]) -> None:
+        """Insert or replace ``entries`` in a single transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (path, size, mtime_ns, digest, target) VALUES (?, ?, ?, ?, ?)",
+                (tuple(e) for e in entries),
+            )
+
+    def remove(self, paths: Iterable[str]) -> None:
+        """Delete the entries for ``paths`` in a single transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM entries WHERE path = ?", ((p,) for p in paths))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,124 @@
+"""Place files into staging layouts by copying, linking or cloning them.
+
+Staging steps mostly rearrange files that already live on the same
+filesystem, so a full byte copy is often unnecessary. :func:`materialize`
+writes ``dst`` using the requested mode and falls back to the next cheapest
+mode when the filesystem does not support it.
+"""
+
+import errno
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+MODES = ("copy", "hardlink", "symlink", "reflink", "copy_file_range")
+
+# Modes tried, in order, for each requested mode.
+_FALLBACKS = {
+    "copy": ("copy",),
+    "hardlink": ("hardlink", "copy"),
+    "symlink": ("symlink", "copy"),
+    "reflink": ("reflink", "copy_file_range", "copy"),
+    "copy_file_range": ("copy_file_range", "copy"),
+}
+
+# Errors meaning "this mode cannot work between these two filesystems".
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+}
+
+# Errors caused by the file itself (not owned under protected_hardlinks, at
+# its link limit): fall back for this file only.
+_FILE_ERRNOS = {errno.EPERM, errno.EMLINK}
+
+_FICLONE = 0x40049409
+
+_unsupported: set[tuple[str, int, int]] = set()
+_lock = threading.Lock()
+
+
+def _reflink(src: str, dst: str) -> None:
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def _copy_file_range(src: str, dst: str) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+    shutil.copystat(src, dst)
+
+
+def _place(mode: str, src: str, dst: str) -> None:
+    if mode == "copy":
+        shutil.copy2(src, dst)
+    elif mode == "hardlink":
+        os.link(src, dst)
+    elif mode == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+    elif mode == "reflink":
+        _reflink(src, dst)
+    elif mode == "copy_file_range":
+        _copy_file_range(src, dst)
+
+
+def materialize(src: str | Path, dst: str | Path, mode: str = "copy") -> str:
+    """Write ``src`` to ``dst`` using ``mode`` and return the mode actually used.
+
+    The file is first written to a temporary name next to ``dst`` and then
+    moved into place, so an existing ``dst`` is replaced atomically and a
+    hard-linked destination never has its shared contents overwritten.
+    Modes that fail with an "unsupported" error are remembered per pair of
+    devices and skipped on later calls.
+    """
+    if mode not in _FALLBACKS:
+        raise ValueError(f"Unknown materialize mode: {mode}")
+
+    src = os.fspath(src)
+    dst = os.fspath(dst)
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+    tmp = os.path.join(
+        os.path.dirname(dst) or ".",
+        f".{os.path.basename(dst)}.{os.getpid()}.{threading.get_ident()}.tmp",
+    )
+
+    for candidate in _FALLBACKS[mode]:
+        if (candidate, *devices) in _unsupported:
+            continue
+        try:
+            _place(candidate, src, tmp)
+        except OSError as e:
+            if os.path.lexists(tmp):
+                os.unlink(tmp)
+            if candidate != "copy" and e.errno in _FILE_ERRNOS:
+                logging.debug(f"{candidate} failed for {src} → {dst} ({e}); falling back")
+                continue
+            if candidate == "copy" or e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            with _lock:
+                if (candidate, *devices) not in _unsupported:
+                    _unsupported.add((candidate, *devices))
+                    logging.warning(f"{candidate} not supported for {src} → {dst} ({e}); falling back")
+            continue
+        os.replace(tmp, dst)
+        if os.path.lexists(tmp):
+            # Renaming a hard link onto another link of the same file is a no-op.
+            os.unlink(tmp)
+        return candidate
+    raise RuntimeError(f"No materialize mode succeeded for {src}")
@@ -0,0 +1,132 @@
+"""In-process LRU cache of loaded YOLO models.
+
+Entries are keyed by the resolved weights path together with the file's size
+and modification time, so replacing a ``.pt`` file on disk is picked up on
+the next lookup. The cache is bounded by a number of models and optionally
+by the total size of their weight files; the least recently used models are
+evicted first.
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+_Entry = namedtuple("_Entry", ["model", "lock", "size"])
+
+
+def _load_yolo(model_path: str):
+    from ultralytics import YOLO
+
+    return YOLO(model_path)
+
+
+def _cache_key(model_path: str) -> tuple[str, int, int]:
+    path = os.path.realpath(model_path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        # Hub model names such as "yolov8n.pt" are downloaded by ultralytics.
+        return path, 0, 0
+    return path, st.st_size, st.st_mtime_ns
+
+
+class ModelCache:
+    """Thread-safe LRU cache of loaded models.
+
+    Each model comes with its own lock: :meth:`lease` holds it for the
+    duration of the ``with`` block, so two callers never run the same model
+    instance at once, while different models can be used concurrently.
+    """
+
+    def __init__(self, max_models: int = 2, max_bytes: int | None = None,
+                 loader: Callable[[str], object] = _load_yolo):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._loading: dict[tuple, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self) -> None:
+        total = sum(e.size for e in self._entries.values())
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models
+            or (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+            self.evictions += 1
+
+    def _lookup(self, key) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def acquire(self, model_path: str) -> tuple[_Entry, bool]:
+        """Return the cache entry for ``model_path`` and whether it was a hit."""
+        key = _cache_key(model_path)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry, True
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Concurrent misses for the same weights wait here for one load.
+        with load_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry, True
+            model = self._loader(model_path)
+            entry = _Entry(model, threading.Lock(), key[1])
+            with self._lock:
+                self.misses += 1
+                for stale in [k for k in self._entries if k[0] == key[0]]:
+                    del self._entries[stale]
+                self._entries[key] = entry
+                self._loading.pop(key, None)
+                self._evict()
+        return entry, False
+
+    @contextmanager
+    def lease(self, model_path: str) -> Iterator[tuple[object, bool]]:
+        """Yield ``(model, hit)`` while holding the model's lock."""
+        entry, hit = self.acquire(model_path)
+        with entry.lock:
+            yield entry.model, hit
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": sum(e.size for e in self._entries.values()),
+            }
+
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return [key[0] for key in self._entries]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+default_cache = ModelCache(
+    max_models=_env_int("MODEL_CACHE_SIZE") or 2,
+    max_bytes=_env_int("MODEL_CACHE_MAX_BYTES"),
+)
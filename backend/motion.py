@@ -0,0 +1,117 @@
+"""Motion-gated inference for fixed-camera video.
+
+Every frame is reduced to a small grayscale thumbnail by strided sampling
+and compared with the thumbnail of the last frame that went through the
+model. Inference only runs when the mean absolute difference reaches
+``threshold`` (on the 0-255 scale) or ``keyframe_interval`` frames have
+passed since the last inferred frame. Skipped frames reuse the detections
+of that frame, so the label files still cover every frame.
+
+For each video a ``<stem>_motion_gate.csv`` sidecar in the output directory
+lists every frame with its score, whether it was inferred, and
+the frame its detections came from.
+"""
+
+import csv
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+GatedFrame = namedtuple("GatedFrame", ["frame", "score", "inferred", "source_frame", "detections"])
+
+# BGR weights of the ITU-R BT.601 luma transform.
+_LUMA = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def gray_thumbnail(frame: np.ndarray, width: int = 64) -> np.ndarray:
+    """Return a roughly ``width`` pixels wide grayscale version of ``frame``."""
+    step = max(1, frame.shape[1] // width)
+    small = frame[::step, ::step].astype(np.float32)
+    return small @ _LUMA if small.ndim == 3 else small
+
+
+class MotionGate:
+    """Decide which frames of one video need inference."""
+
+    def __init__(self, threshold: float = 4.0, keyframe_interval: int = 30, width: int = 64):
+        self.threshold = threshold
+        self.keyframe_interval = keyframe_interval
+        self.width = width
+        self._reference = None
+        self._last_inferred = None
+
+    def check(self, frame_number: int, frame: np.ndarray) -> tuple[bool, float]:
+        """Return whether ``frame`` should be inferred and its change score."""
+        thumb = gray_thumbnail(frame, self.width)
+        if self._reference is None:
+            score, infer = 0.0, True
+        else:
+            score = float(np.abs(thumb - self._reference).mean())
+            infer = score >= self.threshold or bool(
+                self.keyframe_interval and frame_number - self._last_inferred >= self.keyframe_interval
+            )
+        if infer:
+            self._reference = thumb
+            self._last_inferred = frame_number
+        return infer, score
+
+
+def iter_video_frames(video_path: str | Path):
+    """Yield ``(frame_number, bgr_frame)`` pairs numbered from 1 like ultralytics."""
+    import cv2
+
+    capture = cv2.VideoCapture(str(video_path))
+    try:
+        frame_number = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frame_number += 1
+            yield frame_number, frame
+    finally:
+        capture.release()
+
+
+def gated_predictions(video_path: str | Path, detect, sink, gate: MotionGate, sidecar_dir: Path, batch: int = 1):
+    """Run ``detect`` on the frames ``gate`` selects; yield a :class:`GatedFrame` per frame.
+
+    ``detect`` takes a list of BGR frames and returns one list of label rows
+    per frame. The rows of inferred and skipped frames alike are passed to
+    ``sink.add`` (see :func:`backend.result_store.open_label_sink`).
+    """
+    video_path = Path(video_path)
+    stem = video_path.stem
+    pending = []
+    frames = []
+    last_rows, source_frame = [], None
+
+    with open(Path(sidecar_dir) / f"{stem}_motion_gate.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "score", "inferred", "source_frame", "detections"])
+
+        def drain():
+            nonlocal last_rows, source_frame
+            results = iter(detect(frames) if frames else ())
+            for frame_number, score, inferred in pending:
+                if inferred:
+                    last_rows, source_frame = next(results), frame_number
+                sink.add(video_path, frame_number, last_rows)
+                record = GatedFrame(frame_number, round(score, 3), inferred, source_frame, len(last_rows))
+                writer.writerow(record)
+                yield record
+            pending.clear()
+            frames.clear()
+
+        for frame_number, frame in iter_video_frames(video_path):
+            inferred, score = gate.check(frame_number, frame)
+            pending.append((frame_number, score, inferred))
+            if inferred:
+                frames.append(frame)
+                if len(frames) >= batch:
+                    yield from drain()
+            elif not frames:
+                # Nothing is waiting for the model, so the frame can be settled now.
+                yield from drain()
+        yield from drain()
@@ -0,0 +1,224 @@
+"""CPU prediction engine running exported YOLO models with ONNX Runtime.
+
+The ``.pt`` weights are exported to ONNX once; the export is stored next to
+the weights as ``<stem>_<imgsz>.onnx`` and reused until the weights change.
+Images are letterboxed with PIL, run through an ``InferenceSession`` and
+post-processed with numpy, and the detections are written to
+``<output>/labels`` in the same layout as ultralytics' ``save_txt`` (one
+``<stem>.txt`` per image, ``<video stem>_<frame>.txt`` per video frame, and
+no file for images without detections), or to a result store when
+``result_store`` is set.
+
+With ``workers`` > 1 the images are sharded across processes, each running
+its own session with ``cpu_count() // workers`` intra-op threads unless
+``threads`` is given.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from .boxes import batched_nms, xywh_to_xyxy, xyxy_to_xywh
+from .result_store import open_label_sink
+from .sources import is_video, list_sources
+from .utils import emit_status
+
+_CHUNK_SIZE = 16
+
+# Session used by the current worker process, see ``_init_worker``.
+_worker_predictor = None
+
+
+def export_onnx(model_path: str | Path, imgsz: int = 640) -> Path:
+    """Return an ONNX export of ``model_path``, exporting it if needed."""
+    weights = Path(model_path)
+    if weights.suffix.lower() == '.onnx':
+        return weights
+    target = weights.with_name(f"{weights.stem}_{imgsz}.onnx")
+    if target.exists() and target.stat().st_mtime_ns >= weights.stat().st_mtime_ns:
+        return target
+
+    from ultralytics import YOLO
+
+    emit_status('onnx_export_start', model=str(weights), imgsz=imgsz)
+    exported = YOLO(str(weights)).export(format='onnx', imgsz=imgsz, dynamic=False)
+    os.replace(exported, target)
+    emit_status('onnx_export_complete', model=str(weights), path=str(target))
+    return target
+
+
+def create_session(onnx_path: str | Path, intra_threads: int, inter_threads: int = 1):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_threads
+    options.inter_op_num_threads = inter_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(str(onnx_path), sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def letterbox(image: Image.Image, size: int) -> tuple[np.ndarray, float, tuple[int, int]]:
+    """Resize ``image`` into a padded ``size`` square as a ``1x3xSxS`` array.
+
+    Returns the array, the scale factor and the ``(x, y)`` padding needed to
+    map boxes back onto the original image.
+    """
+    width, height = image.size
+    scale = min(size / width, size / height)
+    new_w, new_h = round(width * scale), round(height * scale)
+    pad = ((size - new_w) // 2, (size - new_h) // 2)
+    canvas = Image.new('RGB', (size, size), (114, 114, 114))
+    canvas.paste(image.convert('RGB').resize((new_w, new_h), Image.BILINEAR), pad)
+    array = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1)[None] / 255.0
+    return np.ascontiguousarray(array), scale, pad
+
+
+def postprocess(output: np.ndarray, scale: float, pad: tuple[int, int], image_size: tuple[int, int],
+                conf: float = 0.25, iou: float = 0.7, max_det: int = 300) -> list[tuple]:
+    """Turn a raw ``(1, 4 + classes, anchors)`` output into label rows.
+
+    Rows are ``(class_id, x, y, w, h, confidence)`` with coordinates
+    normalised to the original image.
+    """
+    preds = output[0].T
+    class_scores = preds[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(preds)), classes]
+    mask = scores >= conf
+    if not mask.any():
+        return []
+    boxes = xywh_to_xyxy(preds[mask, :4])
+    scores, classes = scores[mask], classes[mask]
+    keep = batched_nms(boxes, scores, classes, iou)[:max_det]
+    boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+
+    width, height = image_size
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / scale).clip(0, width)
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / scale).clip(0, height)
+    xywh = xyxy_to_xywh(boxes) / np.array([width, height, width, height], dtype=boxes.dtype)
+    return [
+        (int(c), float(x), float(y), float(w), float(h), float(s))
+        for c, (x, y, w, h), s in zip(classes, xywh, scores)
+    ]
+
+
+class OnnxPredictor:
+    """Run one ONNX Runtime session over PIL images."""
+
+    def __init__(self, onnx_path: str | Path, imgsz: int = 640, conf: float = 0.25, iou: float = 0.7,
+                 intra_threads: int | None = None, inter_threads: int = 1, session=None):
+        self.session = session or create_session(onnx_path, intra_threads or os.cpu_count() or 1, inter_threads)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports fix the input size; fall back to ``imgsz`` otherwise.
+        shape = model_input.shape
+        self.imgsz = shape[-1] if isinstance(shape[-1], int) else imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def predict(self, image: Image.Image) -> list[tuple]:
+        array, scale, pad = letterbox(image, self.imgsz)
+        output = self.session.run(None, {self.input_name: array})[0]
+        return postprocess(output, scale, pad, image.size, self.conf, self.iou)
+
+
+def _iter_frames(video_path: Path):
+    import cv2
+
+    capture = cv2.VideoCapture(str(video_path))
+    try:
+        frame = 0
+        while True:
+            ok, bgr = capture.read()
+            if not ok:
+                break
+            frame += 1
+            yield frame, Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+
+
+def predict_paths(predictor: OnnxPredictor, paths):
+    """Predict ``paths``; yield ``(file, frame, rows)`` per image or video frame.
+
+    ``frame`` is ``None`` for still images.
+    """
+    for path in paths:
+        if is_video(path):
+            for frame, image in _iter_frames(path):
+                yield str(path), frame, predictor.predict(image)
+            continue
+        # cv2.imread, used by ultralytics, applies the EXIF orientation too.
+        with Image.open(path) as image:
+            rows = predictor.predict(ImageOps.exif_transpose(image))
+        yield str(path), None, rows
+
+
+def _init_worker(onnx_path, imgsz, conf, iou, intra_threads) -> None:
+    global _worker_predictor
+    _worker_predictor = OnnxPredictor(onnx_path, imgsz, conf, iou, intra_threads)
+
+
+def _predict_chunk(paths) -> list[tuple]:
+    return list(predict_paths(_worker_predictor, paths))
+
+
+def _record(sink, file: str, frame: int | None, rows) -> None:
+    sink.add(file, frame, rows)
+    if frame is None:
+        emit_status('prediction', file=file, detections=len(rows))
+    else:
+        emit_status('prediction', file=file, frame=frame, detections=len(rows))
+
+
+def predict_onnx(cfg, cache=None) -> int:
+    """Predict ``cfg['source']`` on the CPU; return the number of images/frames.
+
+    Still images found in ``cache`` (a :class:`~backend.result_cache.ResultCache`)
+    are served from it, and only the misses are run through the model.
+    """
+    imgsz = cfg.get('imgsz', 640)
+    conf = cfg.get('conf', 0.25)
+    iou = cfg.get('iou', 0.7)
+    workers = max(1, int(cfg.get('workers', 1)))
+    threads = cfg.get('threads') or max(1, (os.cpu_count() or 1) // workers)
+
+    onnx_path = export_onnx(cfg['model'], imgsz)
+    paths = list_sources(cfg['source'])
+    logging.info(f"ONNX prediction: {len(paths)} sources, {workers} workers x {threads} threads")
+    emit_status('engine', engine='onnx', model=str(onnx_path), workers=workers, threads=threads)
+
+    processed = 0
+    with open_label_sink(cfg) as sink:
+        if cache is not None:
+            from .result_cache import CachingSink, serve_cached
+
+            images = [p for p in paths if not is_video(p)]
+            misses, keys = serve_cached(cache, cfg, images, sink)
+            processed = len(images) - len(misses)
+            paths = [p for p in paths if is_video(p)] + misses
+            sink = CachingSink(cache, keys, sink)
+        if workers == 1:
+            predictor = OnnxPredictor(onnx_path, imgsz, conf, iou, threads)
+            for result in predict_paths(predictor, paths):
+                processed += 1
+                _record(sink, *result)
+            return processed
+
+        # Videos are decoded sequentially, so each one is a task of its own.
+        videos = [[p] for p in paths if is_video(p)]
+        images = [p for p in paths if not is_video(p)]
+        chunks = videos + [images[i:i + _CHUNK_SIZE] for i in range(0, len(images), _CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(onnx_path, imgsz, conf, iou, threads)) as pool:
+            futures = [pool.submit(_predict_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                for result in future.result():
+                    processed += 1
+                    _record(sink, *result)
+        return processed
@@ -0,0 +1,284 @@
+"""Run several backend steps as one incremental pipeline.
+
+A pipeline file (JSON or YAML) lists named stages::
+
+    max_workers: 2
+    stages:
+      collect:
+        step: collect
+        config: configs/collect.json      # or an inline mapping
+        inputs: [/mnt/cameras]
+        outputs: [data/images]
+      data_yaml:
+        step: data-yaml
+        needs: [collect]
+        config: {...}
+        inputs: [data/images, data/classes.txt]
+
+``step`` is one of :data:`STEPS` (the command names of ``python -m
+backend``). The stages run in one process as a DAG: a stage starts once
+every stage in ``needs`` has succeeded, and independent stages run
+concurrently on up to ``max_workers`` threads.
+
+Each stage is fingerprinted from its step, its config, the content digests
+of its ``inputs`` (files or directories) and the fingerprints of the stages
+it needs. A stage whose fingerprint matches its last successful run and
+whose ``outputs`` all exist is skipped. Stages without an ``inputs`` key
+always run; use ``inputs: []`` for a stage that depends on its config only.
+Events of each stage are tagged with the stage name (see
+:meth:`backend.events.EventBus.job`), and a stage that reports an ``error``
+event counts as failed. ::
+
+    python -m backend.pipeline <pipeline.yaml> [--force STAGE ...] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .events import bus
+from .manifest import Manifest, ManifestEntry, default_manifest_path
+from .utils import emit_status, ensure_dir, file_digest
+
+# Step name -> (submodule, function taking the stage config)
+STEPS = {
+    "collect": ("collect_images", "collect_images"),
+    "download": ("download_annotated", "download_annotated"),
+    "data-yaml": ("generate_data_yaml", "generate_data_yaml"),
+    "train": ("yolo", "run_training"),
+    "full-train": ("train_yolo", "run_training"),
+    "predict": ("yolo", "run_prediction"),
+    "convert": ("convert_yolo_to_ls", "convert_yolo_to_ls"),
+    "index": ("index_predictions_by_class", "index_predictions"),
+    "detection-index": ("detection_index", "build_detection_index"),
+    "stage": ("stage_predictions_for_upload", "stage_predictions"),
+    "upload": ("upload_gcs", "upload"),
+}
+
+
+class PipelineError(Exception):
+    """Raised for an invalid pipeline definition."""
+
+
+def load_pipeline(path: str | Path) -> dict:
+    """Read and validate a pipeline file; relative config paths resolve against it."""
+    path = Path(path)
+    with open(path, "r") as f:
+        if path.suffix.lower() in (".yaml", ".yml"):
+            import yaml
+
+            spec = yaml.safe_load(f) or {}
+        else:
+            spec = json.load(f)
+
+    stages = spec.get("stages") or {}
+    if not stages:
+        raise PipelineError(f"No stages in {path}")
+    for name, stage in stages.items():
+        if stage.get("step") not in STEPS:
+            raise PipelineError(f"Stage {name!r} has unknown step {stage.get('step')!r}")
+        for dep in stage.get("needs", []):
+            if dep not in stages:
+                raise PipelineError(f"Stage {name!r} needs unknown stage {dep!r}")
+        config = stage.get("config", {})
+        if isinstance(config, str):
+            with open(path.parent / config, "r") as f:
+                stage["config"] = json.load(f)
+    topological_order(stages)
+    return spec
+
+
+def topological_order(stages: dict) -> list[str]:
+    """Return the stage names with every stage after the stages it needs."""
+    order, state = [], {}
+
+    def visit(name, chain):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise PipelineError(f"Dependency cycle: {' -> '.join(chain + [name])}")
+        state[name] = "visiting"
+        for dep in stages[name].get("needs", []):
+            visit(dep, chain + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in stages:
+        visit(name, [])
+    return order
+
+
+class _Digests:
+    """Content digests of input files, reusing a manifest for unchanged ones."""
+
+    def __init__(self, manifest: Manifest):
+        self.manifest = manifest
+        self.known = manifest.load()
+        self._lock = threading.Lock()
+
+    def of(self, path: str | Path) -> str:
+        path = Path(path)
+        if not path.exists():
+            return "missing"
+        files = [path] if path.is_file() else sorted(p for p in path.rglob("*") if p.is_file())
+        h = hashlib.blake2b(digest_size=16)
+        updates = []
+        for file in files:
+            st = file.stat()
+            key = str(file.resolve())
+            entry = self.known.get(key)
+            if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                digest = entry.digest
+            else:
+                digest = file_digest(file)
+                updates.append(ManifestEntry(key, st.st_size, st.st_mtime_ns, digest, None))
+            h.update(f"{file.relative_to(path) if file != path else ''}\0{digest}\n".encode())
+        if updates:
+            with self._lock:
+                self.known.update({e.path: e for e in updates})
+            self.manifest.update(updates)
+        return h.hexdigest()
+
+
+def fingerprint(stage: dict, digests: _Digests, dep_fingerprints: list[str]) -> str | None:
+    """Return the stage fingerprint, or ``None`` for stages without ``inputs``."""
+    if "inputs" not in stage:
+        return None
+    payload = {
+        "step": stage["step"],
+        "config": stage.get("config", {}),
+        "inputs": {str(p): digests.of(p) for p in stage["inputs"]},
+        "needs": dep_fingerprints,
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def _call(step: str, cfg: dict) -> None:
+    module_name, attr = STEPS[step]
+    func = getattr(importlib.import_module(f".{module_name}", __package__), attr)
+    if step == "predict":
+        func(cfg, batch=cfg.get("batch", 1))
+    else:
+        func(cfg)
+
+
+def run_pipeline(spec: dict, state_path: str | Path, digest_path: str | Path, force=(), dry_run: bool = False,
+                 max_workers: int | None = None) -> dict:
+    """Run the stages of ``spec``; return ``{stage: {"status", "seconds"}}``.
+
+    ``state_path`` holds the fingerprints of the last successful runs and
+    ``digest_path`` the manifest of input digests. ``force`` names stages to
+    run even when unchanged. With ``dry_run`` nothing runs; the result shows
+    which stages would run or be skipped.
+    """
+    stages = spec["stages"]
+    order = topological_order(stages)
+    state_path = Path(state_path)
+    state = json.loads(state_path.read_text()) if state_path.exists() else {}
+    workers = max_workers or spec.get("max_workers", 2)
+    results: dict[str, dict] = {}
+    fingerprints: dict[str, str | None] = {}
+    lock = threading.Lock()
+
+    def save_state():
+        ensure_dir(state_path.parent)
+        tmp = state_path.with_name(f".{state_path.name}.tmp")
+        tmp.write_text(json.dumps(state, indent=2))
+        os.replace(tmp, state_path)
+
+    def execute(name: str, digests: _Digests) -> dict:
+        stage = stages[name]
+        deps = [fingerprints[d] or f"run:{d}:{time.time()}" for d in stage.get("needs", [])]
+        fp = fingerprint(stage, digests, deps)
+        fingerprints[name] = fp
+        previous = state.get(name, {})
+        outputs_present = all(Path(p).exists() for p in stage.get("outputs", []))
+        if fp is not None and name not in force and previous.get("fingerprint") == fp and outputs_present:
+            emit_status('stage_skipped', stage=name, step=stage["step"])
+            return {"status": "skipped", "seconds": 0.0}
+        if dry_run:
+            emit_status('stage_would_run', stage=name, step=stage["step"])
+            return {"status": "would_run", "seconds": 0.0}
+
+        errors = []
+
+        def on_event(event, data):
+            if event == "error":
+                errors.append(data.get("message") or data.get("error") or "error")
+
+        emit_status('stage_start', stage=name, step=stage["step"])
+        start = time.perf_counter()
+        with bus.subscription(on_event, job=name), bus.job(name):
+            try:
+                _call(stage["step"], dict(stage.get("config", {})))
+            except Exception as e:
+                logging.exception(f"Stage {name} failed")
+                errors.append(str(e))
+        seconds = round(time.perf_counter() - start, 3)
+        if errors:
+            emit_status('stage_failed', stage=name, step=stage["step"], seconds=seconds, error=errors[-1])
+            return {"status": "failed", "seconds": seconds, "error": errors[-1]}
+        with lock:
+            state[name] = {"fingerprint": fp, "finished": time.time(), "seconds": seconds}
+            save_state()
+        emit_status('stage_complete', stage=name, step=stage["step"], seconds=seconds)
+        return {"status": "completed", "seconds": seconds}
+
+    emit_status('start', action='pipeline', stages=len(order), workers=workers)
+    start = time.perf_counter()
+    with Manifest(digest_path) as manifest, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        digests = _Digests(manifest)
+        running = {}
+        pending = list(order)
+        while pending or running:
+            for name in list(pending):
+                needs = stages[name].get("needs", [])
+                if any(results.get(d, {}).get("status") in ("failed", "blocked") for d in needs):
+                    results[name] = {"status": "blocked", "seconds": 0.0}
+                    emit_status('stage_blocked', stage=name)
+                    pending.remove(name)
+                elif all(results.get(d, {}).get("status") in ("completed", "skipped", "would_run") for d in needs):
+                    running[pool.submit(execute, name, digests)] = name
+                    pending.remove(name)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    total = round(time.perf_counter() - start, 3)
+    failed = [name for name, r in results.items() if r["status"] in ("failed", "blocked")]
+    emit_status('error' if failed else 'complete', action='pipeline', seconds=total,
+                stages={name: results[name] for name in order}, **({"failed": failed} if failed else {}))
+    return {name: results[name] for name in order}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.pipeline")
+    parser.add_argument("pipeline")
+    parser.add_argument("--force", nargs="*", default=[], help="stages to run even when unchanged")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    spec = load_pipeline(args.pipeline)
+    state_path = Path(spec.get("state") or default_manifest_path("pipeline", args.pipeline).with_suffix(".json"))
+    digest_path = default_manifest_path("pipeline", args.pipeline)
+    results = run_pipeline(spec, state_path, digest_path, args.force, args.dry_run, args.workers)
+    for name, result in results.items():
+        print(f"[INFO] {name:<24} {result['status']:<10} {result['seconds']:9.3f}s")
+    sys.stdout.flush()
+    if any(r["status"] in ("failed", "blocked") for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Long-running prediction service that keeps YOLO models loaded.
+
+Spawning ``python -m backend.yolo`` for every prediction pays for the
+ultralytics/torch import and the weight loading each time. This service
+does both once and accepts ``run_prediction``-style configs over a
+localhost HTTP API:
+
+``POST /predict``
+    Body is a prediction config. The response is NDJSON: one line per
+    ``emit_status`` event of that job, ending with ``complete`` or
+    ``error``.
+``GET /status``
+    Running/queued job counts, the loaded models and model cache statistics.
+
+Usage::
+
+    python -m backend.predict_server serve [--host 127.0.0.1] [--port 8765] [--max-jobs 1] [--max-models 2]
+    python -m backend.predict_server submit <config.json> [--url http://127.0.0.1:8765]
+
+``submit`` prints the streamed events to stdout exactly as
+``python -m backend.yolo`` would, so callers parsing that output can switch
+to the service without changes.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import traceback
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .events import bus
+from .model_cache import default_cache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.getenv("PREDICT_SERVER_PORT", "8765"))
+
+
+class PredictionService:
+    """Run prediction jobs with at most ``max_jobs`` running concurrently."""
+
+    def __init__(self, max_jobs: int = 1, max_queue: int = 16):
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_jobs)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.running = 0
+        self.waiting = 0
+
+    def status(self) -> dict:
+        with self._lock:
+            status = {"running": self.running, "queued": self.waiting}
+        return {**status, "models": default_cache.loaded(), "cache": default_cache.stats()}
+
+    def submit(self, cfg: dict, send) -> None:
+        """Run ``cfg`` in the calling thread, passing each event to ``send``."""
+        from .yolo import run_prediction
+
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                send("error", {"message": "prediction queue is full"})
+                return
+            job_id = self._next_id
+            self._next_id += 1
+            self.waiting += 1
+            position = self.waiting
+        send("queued", {"job": job_id, "position": position})
+
+        with self._slots:
+            with self._lock:
+                self.waiting -= 1
+                self.running += 1
+            try:
+                # Models stay loaded in the shared cache between jobs, and
+                # jobs using the same weights are serialised by its lease.
+                with bus.job(job_id), bus.subscription(send, job=job_id):
+                    run_prediction(cfg, batch=cfg.get("batch", 1))
+            except Exception as e:
+                logging.error(traceback.format_exc())
+                send("error", {"action": "predict", "job": job_id, "message": str(e)})
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+
+def _make_handler(service: PredictionService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def _json(self, code: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._json(200, service.status())
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                cfg = json.loads(self.rfile.read(length))
+            except ValueError as e:
+                self._json(400, {"error": f"invalid prediction config: {e}"})
+                return
+            missing = [key for key in ("model", "source", "output") if key not in cfg]
+            if missing:
+                self._json(400, {"error": f"missing config keys: {', '.join(missing)}"})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+
+            def send(event: str, data: dict) -> None:
+                try:
+                    self.wfile.write(json.dumps({"event": event, **data}).encode() + b"\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            service.submit(cfg, send)
+
+        def log_message(self, format, *args):
+            logging.info("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_jobs: int = 1, max_queue: int = 16,
+          max_models: int | None = None) -> None:
+    if max_models:
+        default_cache.max_models = max_models
+    service = PredictionService(max_jobs=max_jobs, max_queue=max_queue)
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    print(f"[INFO] Prediction server listening on http://{host}:{port}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def submit(config_path: str, url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}") -> bool:
+    """Send a config to a running server and echo its events; return success."""
+    with open(config_path, "r") as f:
+        body = f.read().encode()
+    request = urllib.request.Request(
+        f"{url.rstrip('/')}/predict", data=body, headers={"Content-Type": "application/json"}
+    )
+    completed = failed = False
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            sys.stdout.write(line.decode())
+            sys.stdout.flush()
+            payload = json.loads(line)
+            if payload.get("event") == "error":
+                failed = True
+            elif payload.get("event") == "complete" and payload.get("action") == "predict":
+                completed = True
+    return completed and not failed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.predict_server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_p = sub.add_parser("serve")
+    serve_p.add_argument("--host", default=DEFAULT_HOST)
+    serve_p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_p.add_argument("--max-jobs", type=int, default=1)
+    serve_p.add_argument("--max-queue", type=int, default=16)
+    serve_p.add_argument("--max-models", type=int)
+    submit_p = sub.add_parser("submit")
+    submit_p.add_argument("config")
+    submit_p.add_argument("--url", default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.max_jobs, args.max_queue, args.max_models)
+    elif not submit(args.config, args.url):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Decode and resize images ahead of inference.
+
+:class:`PrefetchPipeline` decodes images on a thread pool and hands them
+out as ready-made batches through a bounded queue. When the queue is full
+the decoders wait (backpressure), so memory stays bounded however fast
+decoding is. JPEGs are decoded at reduced size with PIL's draft mode when
+only a small image is needed, which avoids decoding every pixel of very
+large stills.
+
+:meth:`PrefetchPipeline.stats` tells where the time goes: ``consumer_wait``
+is time inference spent waiting for a batch (decoding is the bottleneck),
+``producer_wait`` is time decoded batches waited for a free queue slot
+(inference is the bottleneck).
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+Batch = namedtuple("Batch", ["paths", "images"])
+
+_DONE = object()
+
+
+def load_image(path: str | Path, max_size: int | None = None) -> Image.Image:
+    """Load ``path`` as an upright RGB image no larger than ``max_size``.
+
+    JPEGs are decoded directly at the smallest DCT scale that still covers
+    ``max_size``; the remaining reduction is a regular resize.
+    """
+    with Image.open(path) as image:
+        if max_size and image.format == "JPEG":
+            image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    if max_size and max(image.size) > max_size:
+        scale = max_size / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.BILINEAR)
+    return image
+
+
+class PrefetchPipeline:
+    """Iterate over :class:`Batch` objects decoded in the background.
+
+    Images keep the order of ``paths``. Files that fail to decode are logged
+    and left out of their batch.
+    """
+
+    def __init__(self, paths, batch_size: int = 1, max_size: int | None = None, workers: int = 4,
+                 max_batches: int = 4):
+        self.paths = list(paths)
+        self.batch_size = max(1, batch_size)
+        self.max_size = max_size
+        self.workers = max(1, workers)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_batches))
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._start = None
+        self.images = 0
+        self.batches = 0
+        self.errors = 0
+        self.decode_seconds = 0.0
+        self.producer_wait = 0.0
+        self.consumer_wait = 0.0
+        self._depth_total = 0
+        self.max_depth = 0
+
+    def _decode(self, path: Path):
+        start = time.perf_counter()
+        try:
+            return load_image(path, self.max_size)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Failed to decode {path}: {e}")
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.decode_seconds += elapsed
+
+    def _put(self, item) -> None:
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.producer_wait += time.perf_counter() - start
+
+    def _produce(self) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = deque()
+                batch_paths, batch_images = [], []
+                paths = iter(self.paths)
+                # Keep a bounded number of decodes in flight, in path order.
+                for path in paths:
+                    pending.append((path, pool.submit(self._decode, path)))
+                    if len(pending) >= self.workers * 2:
+                        break
+                while pending and not self._stop.is_set():
+                    path, future = pending.popleft()
+                    nxt = next(paths, None)
+                    if nxt is not None:
+                        pending.append((nxt, pool.submit(self._decode, nxt)))
+                    image = future.result()
+                    if image is None:
+                        self.errors += 1
+                        continue
+                    batch_paths.append(path)
+                    batch_images.append(image)
+                    if len(batch_images) == self.batch_size:
+                        self._put(Batch(batch_paths, batch_images))
+                        batch_paths, batch_images = [], []
+                if batch_images and not self._stop.is_set():
+                    self._put(Batch(batch_paths, batch_images))
+                for _, future in pending:
+                    future.cancel()
+        except BaseException as e:
+            self._put(e)
+        self._put(_DONE)
+
+    def __iter__(self):
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._produce, name="prefetch", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                depth = self._queue.qsize()
+                start = time.perf_counter()
+                item = self._queue.get()
+                self.consumer_wait += time.perf_counter() - start
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                self._depth_total += depth
+                self.max_depth = max(self.max_depth, depth)
+                self.batches += 1
+                self.images += len(item.images)
+                yield item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._start if self._start else 0.0
+        return {
+            "images": self.images,
+            "batches": self.batches,
+            "errors": self.errors,
+            "images_per_sec": round(self.images / elapsed, 2) if elapsed else 0.0,
+            "decode_per_sec": round(self.images / self.decode_seconds * self.workers, 2)
+            if self.decode_seconds else 0.0,
+            "queue_depth": round(self._depth_total / self.batches, 2) if self.batches else 0.0,
+            "max_queue_depth": self.max_depth,
+            "consumer_wait": round(self.consumer_wait, 3),
+            "producer_wait": round(self.producer_wait, 3),
+            "bottleneck": "decode" if self.consumer_wait > self.producer_wait else "inference",
+        }
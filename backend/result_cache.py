@@ -0,0 +1,245 @@
+"""Content-addressed cache of prediction results.
+
+Results are keyed by the image content hash, the model weights hash and the
+prediction parameters (``conf``, ``imgsz``, engine and mode options), so a
+re-run over an overlapping folder only sends new or changed images to the
+model. Image digests are remembered in a :class:`~backend.manifest.Manifest`
+so unchanged files are not re-hashed. The cache is bounded by total stored
+bytes; the least recently used results are evicted when it is closed.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .manifest import Manifest, ManifestEntry
+from .utils import emit_status, ensure_dir, file_digest
+
+DEFAULT_MAX_BYTES = 256 << 20
+
+# Config keys that change what the model returns for the same image.
+# ``prefetch`` decodes at reduced size, so only whether it is on matters.
+_PARAM_KEYS = ('conf', 'iou', 'imgsz', 'engine', 'tiling', 'prefetch')
+
+
+def default_cache_path() -> Path:
+    data_dir = Path(os.getenv("DATA_DIR", "."))
+    return data_dir / "cache" / "predictions.sqlite"
+
+
+class ResultCache:
+    """SQLite cache of label rows keyed by image, model and parameters."""
+
+    def __init__(self, path: str | Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES, workers: int = 4):
+        self.path = Path(path) if path else default_cache_path()
+        self.max_bytes = max_bytes
+        self.workers = workers
+        ensure_dir(self.path.parent)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                rows TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used);
+            """
+        )
+        # Image digests share the database file.
+        self.files = Manifest(self.path)
+        self._pending = []
+        self.hits = 0
+        self.misses = 0
+
+    def digests(self, paths) -> dict[Path, str]:
+        """Return the content digest of each path, hashing only changed files."""
+        paths = [Path(p) for p in paths]
+        stats = {p: os.stat(p) for p in paths}
+        known = self.files.load()
+        result, stale = {}, []
+        for p in paths:
+            st = stats[p]
+            entry = known.get(str(p.resolve()))
+            if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                result[p] = entry.digest
+            else:
+                stale.append(p)
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            for p, digest in zip(stale, pool.map(file_digest, stale)):
+                result[p] = digest
+        self.files.update(
+            ManifestEntry(str(p.resolve()), stats[p].st_size, stats[p].st_mtime_ns, result[p], None) for p in stale
+        )
+        return result
+
+    def keys(self, paths, model_path: str | Path, params: dict) -> dict[Path, str]:
+        """Return the cache key of each image for ``model_path`` and ``params``."""
+        model_digest = file_digest(model_path) if os.path.exists(model_path) else str(model_path)
+        prefix = json.dumps([model_digest, params], sort_keys=True)
+        return {
+            p: hashlib.blake2b(f"{prefix}:{digest}".encode(), digest_size=16).hexdigest()
+            for p, digest in self.digests(paths).items()
+        }
+
+    def get_many(self, keys) -> dict[str, list]:
+        """Return the cached rows for the given keys that are present."""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ", ".join("?" for _ in batch)
+                for key, rows in self._conn.execute(f"SELECT key, rows FROM results WHERE key IN ({marks})", batch):
+                    found[key] = [tuple(row) for row in json.loads(rows)]
+            now = time.time()
+            with self._conn:
+                self._conn.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        # Images with identical content share a key; count every lookup.
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put(self, key: str, rows) -> None:
+        data = json.dumps([list(row) for row in rows])
+        with self._lock:
+            self._pending.append((key, data, len(data), time.time()))
+            if len(self._pending) >= 500:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, rows, bytes, last_used) VALUES (?, ?, ?, ?)", self._pending
+            )
+        self._pending = []
+
+    def evict(self) -> int:
+        """Drop least recently used results until the cache fits ``max_bytes``."""
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            doomed = []
+            for key, size in self._conn.execute("SELECT key, bytes FROM results ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+            return len(doomed)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._flush_locked()
+        evicted = self.evict()
+        if evicted:
+            emit_status('cache_evicted', results=evicted)
+        with self._lock:
+            self._conn.close()
+        self.files.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CachingSink:
+    """Label sink that stores the rows of cached-key images before forwarding them."""
+
+    def __init__(self, cache: ResultCache, keys: dict, sink):
+        self.cache = cache
+        self.keys = {str(Path(p).resolve()): key for p, key in keys.items()}
+        self.sink = sink
+
+    def add(self, source, frame, rows) -> None:
+        key = self.keys.get(str(Path(source).resolve())) if frame is None else None
+        if key is not None:
+            self.cache.put(key, rows)
+        self.sink.add(source, frame, rows)
+
+    def close(self) -> None:
+        self.sink.close()
+
+    def __enter__(self) -> "CachingSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_result_cache(setting) -> ResultCache | None:
+    """Return a :class:`ResultCache` for a ``result_cache`` config value.
+
+    ``True`` uses the default location, a string is used as the database path
+    and a dict may give ``path``, ``max_mb`` and ``workers``.
+    """
+    if not setting:
+        return None
+    if setting is True:
+        return ResultCache()
+    if isinstance(setting, dict):
+        max_mb = setting.get('max_mb')
+        return ResultCache(
+            setting.get('path'),
+            max_bytes=int(max_mb * (1 << 20)) if max_mb else DEFAULT_MAX_BYTES,
+            workers=setting.get('workers', 4),
+        )
+    return ResultCache(setting)
+
+
+def cache_params(cfg) -> dict:
+    """Return the parts of a prediction config that affect its results."""
+    params = {key: cfg.get(key) for key in _PARAM_KEYS}
+    params['prefetch'] = bool(params['prefetch'])
+    return params
+
+
+def serve_cached(cache: ResultCache, cfg, images, sink):
+    """Send cached results of ``images`` to ``sink``; return the misses and their keys.
+
+    Each cache hit emits a ``prediction`` event with ``cached`` set. When the
+    run renders its predictions (``cfg['save']``), hits are rendered into
+    ``cfg['output']`` under their source name, as ultralytics names misses.
+    """
+    keys = cache.keys(images, cfg['model'], cache_params(cfg))
+    found = cache.get_many(keys.values())
+    save = cfg.get('save', not cfg.get('result_store'))
+    output = Path(cfg['output'])
+    misses, hits = [], []
+    for path in images:
+        rows = found.get(keys[path])
+        if rows is None:
+            misses.append(path)
+            continue
+        sink.add(path, None, rows)
+        hits.append((path, rows))
+        emit_status('prediction', file=str(path), detections=len(rows), cached=True)
+    if save and hits:
+        from .result_store import render_image
+
+        ensure_dir(output)
+        with ThreadPoolExecutor(max_workers=max(1, cache.workers)) as pool:
+            list(pool.map(lambda hit: render_image(hit[0], hit[1], output / Path(hit[0]).name), hits))
+    return misses, {p: keys[p] for p in misses}
@@ -0,0 +1,308 @@
+"""Compact columnar store for the detections of one prediction run.
+
+Instead of one ``.txt`` per frame, a run can append its detections to a
+single ``detections.dets`` file in its output directory. The file is a short
+magic header followed by chunks; each chunk holds the source paths it
+introduces and then one contiguous little-endian array per column:
+
+``source`` (index into the source table), ``frame`` (``0`` for still
+images), ``class_id``, ``confidence``, ``x``, ``y``, ``w``, ``h``.
+
+Chunks are only written whole and never split a frame, so a store left
+behind by an interrupted run is readable up to its last complete chunk.
+Label files and rendered images can be produced from a store on demand::
+
+    python -m backend.result_store info <detections.dets>
+    python -m backend.result_store export <detections.dets> <labels_dir> [--save-conf]
+    python -m backend.result_store render <detections.dets> <output_dir> [--raw]
+"""
+
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from .labels import STORE_NAME, LabelDirWriter, label_stem
+from .sources import is_video
+
+MAGIC = b"DETS\x01"
+COLUMNS = (
+    ("source", "<u4"),
+    ("frame", "<u4"),
+    ("class_id", "<u2"),
+    ("confidence", "<f4"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("w", "<f4"),
+    ("h", "<f4"),
+)
+_CHUNK_HEADER = struct.Struct("<4sII")
+
+
+class ResultWriter:
+    """Append detections to a store, ``chunk_rows`` rows per chunk."""
+
+    def __init__(self, path: str | Path, chunk_rows: int = 65536):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_rows = chunk_rows
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self._sources: dict[str, int] = {}
+        self._new_sources: list[str] = []
+        self._columns = {name: [] for name, _ in COLUMNS}
+        self._pending = 0
+        self.rows = 0
+        self.frames = 0
+
+    def add(self, source: str | Path, frame: int | None, rows) -> None:
+        """Record the label ``rows`` of one image or video frame."""
+        self.frames += 1
+        if not rows:
+            return
+        source = str(source)
+        source_id = self._sources.get(source)
+        if source_id is None:
+            source_id = self._sources[source] = len(self._sources)
+            self._new_sources.append(source)
+        columns = self._columns
+        for row in rows:
+            columns["source"].append(source_id)
+            columns["frame"].append(frame or 0)
+            columns["class_id"].append(row[0])
+            columns["x"].append(row[1])
+            columns["y"].append(row[2])
+            columns["w"].append(row[3])
+            columns["h"].append(row[4])
+            columns["confidence"].append(row[5] if len(row) > 5 and row[5] is not None else np.nan)
+        self._pending += len(rows)
+        if self._pending >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        names = json.dumps(self._new_sources).encode()
+        self._file.write(_CHUNK_HEADER.pack(b"CHNK", self._pending, len(names)))
+        self._file.write(names)
+        for name, dtype in COLUMNS:
+            self._file.write(np.asarray(self._columns[name], dtype=dtype).tobytes())
+            self._columns[name] = []
+        self._file.flush()
+        self.rows += self._pending
+        self._pending = 0
+        self._new_sources = []
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ResultStore:
+    """Read a store written by :class:`ResultWriter`."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.sources: list[str] = []
+
+    def iter_chunks(self):
+        """Yield each chunk as a dict of column arrays."""
+        row_size = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        self.sources = []
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a detection store: {self.path}")
+            while True:
+                header = f.read(_CHUNK_HEADER.size)
+                if len(header) < _CHUNK_HEADER.size:
+                    return
+                tag, rows, names_len = _CHUNK_HEADER.unpack(header)
+                if tag != b"CHNK":
+                    raise ValueError(f"Corrupt detection store: {self.path}")
+                names = f.read(names_len)
+                data = f.read(rows * row_size)
+                if len(names) < names_len or len(data) < rows * row_size:
+                    return  # incomplete trailing chunk
+                self.sources.extend(json.loads(names))
+                chunk, offset = {}, 0
+                for name, dtype in COLUMNS:
+                    chunk[name] = np.frombuffer(data, dtype=dtype, count=rows, offset=offset)
+                    offset += rows * np.dtype(dtype).itemsize
+                yield chunk
+
+    def source_paths(self) -> list[str]:
+        """Return the source table without reading the column data."""
+        row_size = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        sources = []
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a detection store: {self.path}")
+            while True:
+                header = f.read(_CHUNK_HEADER.size)
+                if len(header) < _CHUNK_HEADER.size:
+                    return sources
+                _, rows, names_len = _CHUNK_HEADER.unpack(header)
+                names = f.read(names_len)
+                if len(names) < names_len:
+                    return sources
+                sources.extend(json.loads(names))
+                f.seek(rows * row_size, 1)
+
+    def read(self) -> dict[str, np.ndarray]:
+        """Return every column of the store as one array."""
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        return {name: np.concatenate([c[name] for c in chunks]) for name, _ in COLUMNS}
+
+    def iter_frames(self):
+        """Yield ``(source, frame, rows)`` for every image or frame with detections.
+
+        ``frame`` is ``None`` for still images and ``rows`` are label rows
+        ``(class_id, x, y, w, h, confidence)``.
+        """
+        for chunk in self.iter_chunks():
+            source, frame = chunk["source"], chunk["frame"]
+            bounds = np.flatnonzero((source[1:] != source[:-1]) | (frame[1:] != frame[:-1])) + 1
+            starts = np.concatenate(([0], bounds))
+            ends = np.concatenate((bounds, [len(source)]))
+            conf = chunk["confidence"].astype(float)
+            table = np.stack([chunk[c].astype(float) for c in ("x", "y", "w", "h")], axis=1)
+            classes = chunk["class_id"]
+            for start, end in zip(starts, ends):
+                rows = [
+                    (int(classes[i]), *table[i].tolist(), None if np.isnan(conf[i]) else float(conf[i]))
+                    for i in range(start, end)
+                ]
+                yield self.sources[source[start]], int(frame[start]) or None, rows
+
+    def iter_frame_classes(self):
+        """Yield ``(source, frame, sorted class ids)`` per image or frame."""
+        for source, frame, rows in self.iter_frames():
+            yield source, frame, sorted({row[0] for row in rows})
+
+
+def open_label_sink(cfg):
+    """Return where a prediction run's label rows go.
+
+    ``cfg['result_store']`` set to ``true`` (or a path) selects a
+    :class:`ResultWriter` in the output directory; otherwise rows are
+    written as ``labels/*.txt`` files.
+    """
+    store = cfg.get('result_store')
+    if store:
+        return ResultWriter(Path(cfg['output']) / STORE_NAME if store is True else store)
+    return LabelDirWriter(Path(cfg['output']) / 'labels', cfg.get('save_conf', False))
+
+
+def export_labels(store_path: str | Path, labels_dir: str | Path, save_conf: bool = False) -> int:
+    """Write the store as ``save_txt``-style label files; return the file count."""
+    count = 0
+    with LabelDirWriter(labels_dir, save_conf) as writer:
+        for source, frame, rows in ResultStore(store_path).iter_frames():
+            writer.add(source, frame, rows)
+            count += 1
+    return count
+
+
+def _draw(image, rows):
+    from PIL import ImageDraw
+
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+    for cls_id, x, y, w, h, conf in rows:
+        box = ((x - w / 2) * width, (y - h / 2) * height, (x + w / 2) * width, (y + h / 2) * height)
+        draw.rectangle(box, outline=(255, 64, 64), width=max(2, width // 640))
+        label = str(cls_id) if conf is None else f"{cls_id} {conf:.2f}"
+        draw.text((box[0] + 2, box[1] + 2), label, fill=(255, 64, 64))
+    return image
+
+
+def render_image(source: str | Path, rows, path: str | Path, annotate: bool = True) -> None:
+    """Save still image ``source`` to ``path`` with the boxes of ``rows`` drawn in."""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        if annotate:
+            _draw(image, rows)
+        image.save(path, quality=95)
+
+
+def render(store_path: str | Path, output_dir: str | Path, annotate: bool = True) -> int:
+    """Save a JPEG per image or frame with detections; return the count.
+
+    Files are named like the label files (``<stem>.jpg`` or
+    ``<video stem>_<frame>.jpg``). With ``annotate`` false the frames are
+    saved without boxes.
+    """
+    from PIL import Image
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    by_source: dict[str, dict] = {}
+    for source, frame, rows in ResultStore(store_path).iter_frames():
+        by_source.setdefault(source, {})[frame] = rows
+
+    count = 0
+    for source, frames in by_source.items():
+        stem = Path(source).stem
+        if is_video(source):
+            from .motion import iter_video_frames
+
+            wanted = frames
+            last = max(wanted)
+            for frame, bgr in iter_video_frames(source):
+                if frame in wanted:
+                    image = Image.fromarray(bgr[..., ::-1])
+                    if annotate:
+                        _draw(image, wanted[frame])
+                    image.save(output_dir / f"{label_stem(stem, frame)}.jpg", quality=95)
+                    count += 1
+                if frame >= last:
+                    break
+        else:
+            render_image(source, frames[None], output_dir / f"{stem}.jpg", annotate)
+            count += 1
+    return count
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.result_store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info_p = sub.add_parser("info")
+    info_p.add_argument("store")
+    export_p = sub.add_parser("export")
+    export_p.add_argument("store")
+    export_p.add_argument("labels_dir")
+    export_p.add_argument("--save-conf", action="store_true")
+    render_p = sub.add_parser("render")
+    render_p.add_argument("store")
+    render_p.add_argument("output_dir")
+    render_p.add_argument("--raw", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        store = ResultStore(args.store)
+        columns = store.read()
+        frames = len({(s, f) for s, f in zip(columns["source"].tolist(), columns["frame"].tolist())})
+        print(json.dumps({"sources": len(store.sources), "frames": frames, "detections": len(columns["source"])}))
+    elif args.command == "export":
+        print(f"[INFO] Wrote {export_labels(args.store, args.labels_dir, args.save_conf)} label files")
+    else:
+        print(f"[INFO] Rendered {render(args.store, args.output_dir, not args.raw)} images")
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
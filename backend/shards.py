@@ -0,0 +1,295 @@
+"""Pack image/label datasets into tar shards.
+
+A dataset directory with ``images/`` and ``labels/`` (as written by
+``stage_predictions``, ``download_annotated`` and ``collect_images``) is
+packed into ``shard-000000.tar``, ``shard-000001.tar``, ... of about
+``shard_size`` bytes each. As in WebDataset, every image and its label are
+stored next to each other under the same key (the file stem), so a shard
+can be read sequentially from a stream without extracting it. Each shard
+has a ``<shard>.index.json`` sidecar mapping every key to the offset and
+size of its members for random access by stem.
+
+Shards are written in parallel and deterministically: a shard whose
+content is unchanged keeps its existing file and modification time, so
+``gsutil rsync`` only ships the shards that changed::
+
+    python -m backend.shards pack <dataset_dir> <shards_dir> [--shard-size-mb 1024] [--workers 4]
+    python -m backend.shards unpack <shards_dir> <dataset_dir>
+    python -m backend.shards info <shards_dir>
+"""
+
+import argparse
+import json
+import os
+import sys
+import tarfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .sources import IMAGE_EXTENSIONS
+from .utils import emit_status, ensure_dir, file_digest, index_by_stem
+
+SHARD_PREFIX = "shard"
+INDEX_SUFFIX = ".index.json"
+DEFAULT_SHARD_SIZE = 1 << 30
+
+
+def _dataset_dirs(dataset_dir: Path) -> tuple[Path, Path | None]:
+    images = dataset_dir / "images"
+    labels = dataset_dir / "labels"
+    if not images.is_dir():
+        images = dataset_dir
+    return images, labels if labels.is_dir() else None
+
+
+def collect_samples(dataset_dir: str | Path) -> list[tuple[str, list[Path]]]:
+    """Return ``(key, member files)`` per image of ``dataset_dir``, sorted by key.
+
+    Samples are keyed by file stem, so two images sharing a stem (``a.jpg``
+    and ``a.png``) raise ``ValueError`` instead of one being dropped.
+    """
+    images_dir, labels_dir = _dataset_dirs(Path(dataset_dir))
+    by_stem = defaultdict(list)
+    for p in images_dir.iterdir():
+        if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file():
+            by_stem[p.stem].append(p)
+    duplicates = sorted(stem for stem, files in by_stem.items() if len(files) > 1)
+    if duplicates:
+        raise ValueError(
+            f"{len(duplicates)} image stems in {images_dir} have several files "
+            f"(e.g. {', '.join(duplicates[:5])}); shard keys must be unique"
+        )
+    labels = index_by_stem(labels_dir, (".txt",)) if labels_dir is not None else {}
+    return [
+        (stem, files + ([labels[stem]] if stem in labels else []))
+        for stem, files in sorted(by_stem.items())
+    ]
+
+
+def _member_size(size: int) -> int:
+    # Header block plus data padded to whole 512-byte blocks.
+    return 512 + -(-size // 512) * 512
+
+
+def plan_shards(samples, shard_size: int = DEFAULT_SHARD_SIZE) -> list[list]:
+    """Split ``samples`` into consecutive groups of about ``shard_size`` bytes."""
+    shards, current, used = [], [], 0
+    for sample in samples:
+        size = sum(_member_size(os.path.getsize(p)) for p in sample[1])
+        if current and used + size > shard_size:
+            shards.append(current)
+            current, used = [], 0
+        current.append(sample)
+        used += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _tarinfo(tar: tarfile.TarFile, path: Path, arcname: str) -> tarfile.TarInfo:
+    info = tar.gettarinfo(str(path), arcname)
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    info.mode = 0o644
+    # A fractional mtime would add a PAX header to every member.
+    info.mtime = int(info.mtime)
+    return info
+
+
+def write_shard(path: str | Path, samples) -> dict:
+    """Write one shard and its index; return a summary with ``changed`` set if it was rewritten."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    index = {}
+    with tarfile.open(tmp, "w", format=tarfile.PAX_FORMAT) as tar:
+        for key, members in samples:
+            entry = index[key] = {}
+            for member in members:
+                ext = member.suffix.lstrip(".").lower()
+                info = _tarinfo(tar, member, f"{key}.{ext}")
+                with open(member, "rb") as f:
+                    tar.addfile(info, f)
+                # The data ends at the current offset, padded to whole blocks.
+                entry[ext] = [tar.offset - -(-info.size // 512) * 512, info.size]
+
+    changed = (
+        not path.exists()
+        or path.stat().st_size != tmp.stat().st_size
+        or file_digest(path) != file_digest(tmp)
+    )
+    if changed:
+        os.replace(tmp, path)
+    else:
+        os.unlink(tmp)
+    index_path = path.with_name(path.name + INDEX_SUFFIX)
+    data = json.dumps(index, separators=(",", ":"))
+    if changed or not index_path.exists() or index_path.read_text() != data:
+        index_path.write_text(data)
+    return {"shard": path.name, "samples": len(samples), "bytes": path.stat().st_size, "changed": changed}
+
+
+def shard_paths(shards_dir: str | Path) -> list[Path]:
+    return sorted(Path(shards_dir).glob(f"{SHARD_PREFIX}-*.tar"))
+
+
+def pack(dataset_dir: str | Path, shards_dir: str | Path, shard_size: int = DEFAULT_SHARD_SIZE,
+         workers: int = 4) -> list[dict]:
+    """Pack ``dataset_dir`` into ``shards_dir``; return one summary per shard.
+
+    Shards left over from an earlier, larger pack are removed.
+    """
+    shards_dir = Path(shards_dir)
+    ensure_dir(shards_dir)
+    plan = plan_shards(collect_samples(dataset_dir), shard_size)
+    paths = [shards_dir / f"{SHARD_PREFIX}-{i:06d}.tar" for i in range(len(plan))]
+    emit_status('shards_start', source=str(dataset_dir), shards=len(plan),
+                samples=sum(len(s) for s in plan))
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for result in pool.map(write_shard, paths, plan):
+            emit_status('shard_written', **result)
+            results.append(result)
+
+    for stale in shard_paths(shards_dir)[len(plan):]:
+        stale.unlink()
+        index_path = stale.with_name(stale.name + INDEX_SUFFIX)
+        if index_path.exists():
+            index_path.unlink()
+    return results
+
+
+def _split_key(name: str) -> tuple[str, str]:
+    key, _, ext = name.rpartition(".")
+    return key, ext
+
+
+def _iter_tar(fileobj):
+    key, sample = None, {}
+    with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            name_key, ext = _split_key(member.name)
+            if name_key != key and sample:
+                yield key, sample
+                sample = {}
+            key = name_key
+            sample[ext] = tar.extractfile(member).read()
+    if sample:
+        yield key, sample
+
+
+def iter_samples(source):
+    """Yield ``(key, {extension: bytes})`` from shards without extracting them.
+
+    ``source`` is a shard directory, a shard path, or a readable binary
+    stream (such as the stdout of ``gsutil cat``); shards are read strictly
+    sequentially.
+    """
+    if hasattr(source, "read"):
+        yield from _iter_tar(source)
+        return
+    source = Path(source)
+    for path in shard_paths(source) if source.is_dir() else [source]:
+        with open(path, "rb") as f:
+            yield from _iter_tar(f)
+
+
+class ShardIndex:
+    """Random access to the samples of a shard directory by key."""
+
+    def __init__(self, shards_dir: str | Path):
+        self._entries: dict[str, tuple[Path, dict]] = {}
+        for path in shard_paths(shards_dir):
+            with open(path.with_name(path.name + INDEX_SUFFIX), "r") as f:
+                for key, members in json.load(f).items():
+                    self._entries[key] = (path, members)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def keys(self):
+        return self._entries.keys()
+
+    def get(self, key: str) -> dict[str, bytes]:
+        """Return ``{extension: bytes}`` for ``key``; raises ``KeyError`` if absent."""
+        path, members = self._entries[key]
+        sample = {}
+        with open(path, "rb") as f:
+            for ext, (offset, size) in members.items():
+                f.seek(offset)
+                sample[ext] = f.read(size)
+        return sample
+
+
+def unpack(source, dataset_dir: str | Path) -> int:
+    """Write the samples of ``source`` back as ``images/`` and ``labels/``; return the count."""
+    images_dir = Path(dataset_dir) / "images"
+    labels_dir = Path(dataset_dir) / "labels"
+    ensure_dir(images_dir)
+    ensure_dir(labels_dir)
+    count = 0
+    for key, sample in iter_samples(source):
+        for ext, data in sample.items():
+            (labels_dir if ext == "txt" else images_dir).joinpath(f"{key}.{ext}").write_bytes(data)
+        count += 1
+    return count
+
+
+def resolve_shards_option(value, local_path: str) -> dict | None:
+    """Interpret the ``shards`` option of ``upload_gcs``.
+
+    ``True`` packs into ``$DATA_DIR/shards/<name of local_path>``; a dict may
+    give ``dir``, ``shard_size_mb`` and ``workers``.
+    """
+    if not value:
+        return None
+    options = value if isinstance(value, dict) else {}
+    default_dir = Path(os.getenv("DATA_DIR", ".")) / "shards" / Path(local_path).resolve().name
+    return {
+        "dir": Path(options.get("dir") or default_dir),
+        "shard_size": int(options.get("shard_size_mb", DEFAULT_SHARD_SIZE >> 20)) << 20,
+        "workers": options.get("workers", 4),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.shards")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack_p = sub.add_parser("pack")
+    pack_p.add_argument("dataset_dir")
+    pack_p.add_argument("shards_dir")
+    pack_p.add_argument("--shard-size-mb", type=int, default=DEFAULT_SHARD_SIZE >> 20)
+    pack_p.add_argument("--workers", type=int, default=4)
+    unpack_p = sub.add_parser("unpack")
+    unpack_p.add_argument("shards_dir")
+    unpack_p.add_argument("dataset_dir")
+    info_p = sub.add_parser("info")
+    info_p.add_argument("shards_dir")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        emit_status('start', action='pack_shards', source=args.dataset_dir, destination=args.shards_dir)
+        results = pack(args.dataset_dir, args.shards_dir, args.shard_size_mb << 20, args.workers)
+        emit_status('complete', action='pack_shards', shards=len(results),
+                    samples=sum(r["samples"] for r in results), changed=sum(r["changed"] for r in results))
+    elif args.command == "unpack":
+        emit_status('start', action='unpack_shards', source=args.shards_dir, destination=args.dataset_dir)
+        emit_status('complete', action='unpack_shards', samples=unpack(args.shards_dir, args.dataset_dir))
+    else:
+        paths = shard_paths(args.shards_dir)
+        print(json.dumps({
+            "shards": len(paths),
+            "samples": len(ShardIndex(args.shards_dir)),
+            "bytes": sum(p.stat().st_size for p in paths),
+        }))
+    sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
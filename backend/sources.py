@@ -0,0 +1,19 @@
+"""Listing the images and videos of a prediction source."""
+
+from pathlib import Path
+
+IMAGE_EXTENSIONS = ('.bmp', '.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp')
+VIDEO_EXTENSIONS = ('.avi', '.mp4', '.mov', '.mkv')
+
+
+def is_video(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in VIDEO_EXTENSIONS
+
+
+def list_sources(source: str | Path) -> list[Path]:
+    """Return the image and video files for a file or directory ``source``."""
+    source = Path(source)
+    if source.is_file():
+        return [source]
+    exts = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+    return sorted(p for p in source.iterdir() if p.suffix.lower() in exts and p.is_file())
@@ -1,4 +1,3 @@
-import shutil
 import logging
 import os
 import sys
@@ -6,6 +5,10 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime
+from collections import defaultdict
+from .labels import STORE_NAME, frame_number, label_stem, read_label_file, write_label_file
+from .materialize import materialize
+from .sources import is_video
 from .utils import emit_status
 
 
@@ -18,12 +21,121 @@ def ensure_dir(path):
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
+def _class_filter(cfg):
+    """Return the class ids to keep, or ``None`` to keep every frame."""
+    wanted = cfg.get('filter_classes')
+    if not wanted:
+        return None
+    from .index_predictions_by_class import load_class_map
+
+    reverse_class_map = {v: k for k, v in load_class_map(cfg['class_map']).items()}
+    names = [wanted] if isinstance(wanted, str) else wanted
+    missing = [n for n in names if n not in reverse_class_map]
+    if missing:
+        raise ValueError(f"Unknown classes in filter_classes: {', '.join(missing)}")
+    return {reverse_class_map[n] for n in names}
+
+
+def _video_frame_labels(cfg, prediction_dir, labels_dir):
+    """Return ``{video path: {frame: (stem, rows, label file or None)}}`` for a video run.
+
+    Labels are matched to a video by the ``<video stem>`` part of their
+    ``<video stem>_<frame>`` names; labels of stills and of other videos are
+    ignored. ``cfg['video']`` set to a path selects that one video.
+    """
+    video = cfg['video']
+    wanted = Path(video) if video is not True else None
+    frames = defaultdict(dict)
+    store_path = prediction_dir / STORE_NAME
+    if store_path.exists() and not labels_dir.exists():
+        from .result_store import ResultStore
+
+        store = ResultStore(store_path)
+        sources = {Path(s) for s in store.source_paths() if is_video(s)}
+        if wanted is not None:
+            # A single video may have been moved or renamed since the run.
+            sources = sources if len(sources) == 1 else {s for s in sources if s.stem == wanted.stem}
+        for source, frame, rows in store.iter_frames():
+            if frame is not None and Path(source) in sources:
+                path = wanted or Path(source)
+                frames[path][frame] = (label_stem(Path(source).stem, frame), rows, None)
+        return frames
+
+    groups = defaultdict(dict)
+    for label_file in labels_dir.glob('*.txt'):
+        frame = frame_number(label_file.stem)
+        if frame is not None:
+            groups[label_file.stem.rpartition('_')[0]][frame] = (label_file.stem, None, label_file)
+    if wanted is not None:
+        videos = {wanted.stem: wanted}
+    else:
+        videos = {p.stem: p for p in sorted(prediction_dir.iterdir()) if is_video(p) and p.is_file()}
+        if not videos:
+            raise FileNotFoundError(f"No video found in {prediction_dir}; set 'video' to the source video")
+    for name, group in groups.items():
+        if name in videos:
+            frames[videos[name]] = group
+        else:
+            logging.info(f"Ignoring {len(group)} labels of {name}: no matching video")
+    return frames
+
+
+def _stage_video_frames(cfg, frames_by_video, images_dest, labels_dest, mode):
+    """Extract the labelled frames of each video as JPEGs; return ``(staged, skipped)``.
+
+    ``frames_by_video`` is laid out as returned by :func:`_video_frame_labels`.
+    """
+    from .video_frames import extract_frames
+
+    keep = _class_filter(cfg)
+    count = skipped = 0
+    for video, frames in frames_by_video.items():
+        if keep is not None:
+            frames = {
+                frame: (stem, rows if rows is not None else read_label_file(label_file), label_file)
+                for frame, (stem, rows, label_file) in frames.items()
+            }
+            frames = {frame: entry for frame, entry in frames.items() if keep & {row[0] for row in entry[1]}}
+        emit_status('extract_frames', video=str(video), frames=len(frames))
+        targets = {frame: images_dest / f"{stem}.jpg" for frame, (stem, _, _) in frames.items()}
+        written = extract_frames(
+            video,
+            targets,
+            workers=cfg.get('workers', 4),
+            quality=cfg.get('jpeg_quality', 95),
+            seek_gap=cfg.get('seek_gap', 120),
+        )
+        for frame in sorted(frames):
+            stem, rows, label_file = frames[frame]
+            if frame not in written:
+                logging.warning(f"Frame {frame} not found in {video}")
+                skipped += 1
+                emit_status('missing_frame', video=str(video), frame=frame, label=f"{stem}.txt")
+                continue
+            if label_file is not None:
+                materialize(label_file, labels_dest / label_file.name, mode)
+            else:
+                write_label_file(labels_dest / f"{stem}.txt", rows)
+            emit_status('staged', image=f"{stem}.jpg", label=f"{stem}.txt", frame=frame)
+            count += 1
+    return count, skipped
+
+
 def stage_predictions(cfg):
+    """Copy (or link) the prediction images and labels of a run to ``destination``.
+
+    With ``cfg['video']`` set, the labelled frames of a video run are
+    extracted from the video instead: ``true`` uses the run's video (the
+    source recorded in its result store, or the rendered ``.avi``), a path
+    names the source video explicitly. ``filter_classes`` (names resolved
+    through ``class_map``) keeps only frames containing one of them.
+    """
     prediction_dir = Path(cfg['prediction_dir'])
     labels_dir = prediction_dir / 'labels'
     dest_root = Path(cfg['destination'])
     images_dest = dest_root / 'images'
     labels_dest = dest_root / 'labels'
+    mode = cfg.get('materialize', 'copy')
 
     ensure_dir(images_dest)
     ensure_dir(labels_dest)
@@ -32,6 +144,43 @@ def stage_predictions(cfg):
     skipped = 0
     emit_status('start', action='stage_predictions')
 
+    if cfg.get('video'):
+        frames = _video_frame_labels(cfg, prediction_dir, labels_dir)
+        count, skipped = _stage_video_frames(cfg, frames, images_dest, labels_dest, mode)
+        emit_status('complete', action='stage_predictions', staged=count, skipped=skipped)
+        return {'staged': count, 'skipped': skipped}
+
+    store_path = prediction_dir / STORE_NAME
+    if store_path.exists() and not labels_dir.exists():
+        # Labels come straight from the run's result store. Store runs do not
+        # render by default, so stills fall back to their source image and
+        # video frames are extracted from the source video.
+        from .result_store import ResultStore
+
+        video_frames = defaultdict(dict)
+        for source, frame, rows in ResultStore(store_path).iter_frames():
+            stem = label_stem(Path(source).stem, frame)
+            if frame is not None and is_video(source):
+                video_frames[Path(source)][frame] = (stem, rows, None)
+                continue
+            image_file = prediction_dir / f"{stem}.jpg"
+            if not image_file.exists():
+                image_file = Path(source)
+            if not image_file.exists():
+                logging.warning(f"Missing image for label: {stem}.txt")
+                skipped += 1
+                emit_status('missing_image', label=f"{stem}.txt")
+                continue
+            image_name = f"{stem}{image_file.suffix.lower()}"
+            materialize(image_file, images_dest / image_name, mode)
+            write_label_file(labels_dest / f"{stem}.txt", rows)
+            emit_status('staged', image=image_name, label=f"{stem}.txt")
+            count += 1
+        if video_frames:
+            staged, missed = _stage_video_frames(cfg, video_frames, images_dest, labels_dest, mode)
+            count += staged
+            skipped += missed
+
     for label_file in labels_dir.glob('*.txt'):
         image_file = prediction_dir / label_file.name.replace('.txt', '.jpg')
         if not image_file.exists():
@@ -40,8 +189,8 @@ def stage_predictions(cfg):
             emit_status('missing_image', label=str(label_file))
             continue
 
-        shutil.copy2(image_file, images_dest / image_file.name)
-        shutil.copy2(label_file, labels_dest / label_file.name)
+        materialize(image_file, images_dest / image_file.name, mode)
+        materialize(label_file, labels_dest / label_file.name, mode)
         logging.info(f"Staged: {image_file.name} and {label_file.name}")
         emit_status('staged', image=image_file.name, label=label_file.name)
         count += 1
@@ -0,0 +1,209 @@
+"""Storage backends and a manifest-driven directory sync.
+
+:func:`open_storage` returns a :class:`LocalStorage` for a filesystem path
+(local disks, NAS mounts, tests) or a :class:`GCSStorage` for a
+``gs://bucket/prefix`` URL. Both implement ``put``, ``delete`` and ``list``.
+
+:func:`sync` mirrors a local directory into a storage backend. A
+:class:`~backend.manifest.Manifest` remembers the content digest of every
+file uploaded to that destination, so a re-run hashes only files whose size
+or modification time changed and uploads only files whose digest differs,
+without listing the remote. Uploads run on a bounded thread pool and are
+retried with exponential backoff; every file reports its own status event.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from .manifest import Manifest, ManifestEntry
+from .materialize import materialize
+from .utils import emit_status, ensure_dir, file_digest
+
+_BATCH = 500
+
+
+class LocalStorage:
+    """Store objects as files below ``root``."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.url = str(self.root)
+
+    def put(self, path: str | Path, key: str) -> None:
+        target = self.root / key
+        ensure_dir(target.parent)
+        materialize(path, target, "copy")
+
+    def delete(self, key: str) -> None:
+        try:
+            (self.root / key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        """Yield the keys of all stored objects."""
+        if not self.root.exists():
+            return
+        for path in self.root.rglob("*"):
+            if path.is_file():
+                yield path.relative_to(self.root).as_posix()
+
+
+class GCSStorage:
+    """Store objects in a Google Cloud Storage bucket below ``prefix``.
+
+    Needs the ``google-cloud-storage`` package; the client is created on
+    first use and shared by the upload threads.
+    """
+
+    def __init__(self, bucket: str, prefix: str = ""):
+        self.bucket_name = bucket
+        self.prefix = prefix.strip("/")
+        self.url = f"gs://{bucket}/{self.prefix}".rstrip("/")
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            try:
+                from google.cloud import storage
+            except ImportError as e:
+                raise ImportError("GCS uploads need the google-cloud-storage package") from e
+            self._bucket = storage.Client().bucket(self.bucket_name)
+        return self._bucket
+
+    def _name(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, path: str | Path, key: str) -> None:
+        self.bucket.blob(self._name(key)).upload_from_filename(str(path))
+
+    def delete(self, key: str) -> None:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self.bucket.blob(self._name(key)).delete()
+        except NotFound:
+            pass
+
+    def list(self):
+        start = len(self.prefix) + 1 if self.prefix else 0
+        for blob in self.bucket.client.list_blobs(self.bucket_name, prefix=f"{self.prefix}/" if self.prefix else None):
+            yield blob.name[start:]
+
+
+def open_storage(url: str):
+    """Return the storage backend for ``url`` (``gs://bucket/prefix`` or a path)."""
+    if url.startswith("gs://"):
+        bucket, _, prefix = url[len("gs://"):].partition("/")
+        return GCSStorage(bucket, prefix)
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    return LocalStorage(os.path.expanduser(url))
+
+
+def _put_with_retries(storage, path: Path, key: str, retries: int, backoff: float) -> None:
+    for attempt in range(retries + 1):
+        try:
+            storage.put(path, key)
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            logging.warning(f"Upload of {key} failed ({e}); retrying in {delay:.1f}s")
+            emit_status('upload_retry', file=key, attempt=attempt + 1, error=str(e))
+            time.sleep(delay)
+
+
+def sync(local_path: str | Path, storage, manifest_path: str | Path, *, dry_run: bool = False,
+         delete_extras: bool = False, workers: int = 8, retries: int = 3, backoff: float = 1.0,
+         remote_listing: bool = False) -> dict:
+    """Upload the new and changed files of ``local_path`` to ``storage``.
+
+    ``dry_run`` only reports what would be uploaded or deleted.
+    ``delete_extras`` deletes remote objects whose local file is gone; the
+    manifest provides those objects unless ``remote_listing`` is set, in which
+    case the remote is listed once so objects uploaded by other means are
+    deleted, and missing objects re-uploaded, as well. Returns counts of
+    uploaded, unchanged, deleted and failed files.
+    """
+    local_path = Path(local_path)
+    files = sorted(p for p in local_path.rglob("*") if p.is_file())
+    keys = {p: p.relative_to(local_path).as_posix() for p in files}
+
+    with Manifest(manifest_path) as manifest:
+        known = manifest.load()
+        remote = set(storage.list()) if remote_listing else None
+
+        def digest(path):
+            entry = known.get(keys[path])
+            st = path.stat()
+            if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                return st, entry.digest
+            return st, file_digest(path)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            state = dict(zip(files, pool.map(digest, files)))
+        todo = [
+            p for p in files
+            if keys[p] not in known
+            or known[keys[p]].digest != state[p][1]
+            or (remote is not None and keys[p] not in remote)
+        ]
+        local_keys = set(keys.values())
+        extras = []
+        if delete_extras:
+            candidates = set(known) | (remote or set())
+            extras = sorted(k for k in candidates if k not in local_keys)
+
+        if dry_run:
+            for path in todo:
+                emit_status('would_upload', file=keys[path], size=state[path][0].st_size)
+            for key in extras:
+                emit_status('would_delete', file=key)
+            return {"uploaded": 0, "unchanged": len(files) - len(todo), "deleted": 0, "failed": 0,
+                    "would_upload": len(todo), "would_delete": len(extras)}
+
+        uploaded = failed = 0
+        pending = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(_put_with_retries, storage, path, keys[path], retries, backoff): path for path in todo
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                key = keys[path]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    logging.error(f"Upload of {key} failed: {e}")
+                    emit_status('upload_failed', file=key, error=str(e))
+                    continue
+                st, digest_value = state[path]
+                pending.append(ManifestEntry(key, st.st_size, st.st_mtime_ns, digest_value, storage.url))
+                uploaded += 1
+                emit_status('uploaded', file=key, size=st.st_size)
+                if len(pending) >= _BATCH:
+                    manifest.update(pending)
+                    pending = []
+        manifest.update(pending)
+
+        removed = []
+        for key in extras:
+            try:
+                storage.delete(key)
+            except Exception as e:
+                failed += 1
+                logging.error(f"Delete of {key} failed: {e}")
+                emit_status('delete_failed', file=key, error=str(e))
+                continue
+            removed.append(key)
+            emit_status('deleted', file=key)
+        manifest.remove(removed)
+
+    return {"uploaded": uploaded, "unchanged": len(files) - len(todo), "deleted": len(removed), "failed": failed}
@@ -0,0 +1,92 @@
+"""Tiled prediction for very large still images.
+
+An image is covered by overlapping square tiles, which are cropped lazily
+and sent to the model ``batch`` at a time, so at most one decoded image and
+one batch of tiles are held in memory. Detections are mapped back to image
+coordinates and merged with one class-aware NMS pass across all tiles.
+"""
+
+import numpy as np
+from PIL import Image
+
+from .boxes import batched_nms, xywh_to_xyxy, xyxy_to_xywh
+
+Box = tuple[int, int, int, int]
+
+
+def _starts(length: int, tile: int, overlap: float) -> list[int]:
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1 - overlap)))
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def tile_grid(width: int, height: int, tile: int = 1280, overlap: float = 0.2,
+              full_image: bool = False) -> list[Box]:
+    """Return ``(x0, y0, x1, y1)`` tiles covering a ``width`` x ``height`` image.
+
+    The last tile of each row and column is aligned with the image edge.
+    ``full_image`` adds the whole image as a final tile so that objects
+    larger than a tile are still found.
+    """
+    grid = [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in _starts(height, tile, overlap)
+        for x in _starts(width, tile, overlap)
+    ]
+    if full_image and len(grid) > 1:
+        grid.append((0, 0, width, height))
+    return grid
+
+
+def iter_tile_batches(image: Image.Image, grid: list[Box], batch: int = 8):
+    """Yield ``(boxes, crops)`` for ``batch`` tiles at a time."""
+    full = (0, 0, image.width, image.height)
+    for i in range(0, len(grid), max(1, batch)):
+        boxes = grid[i:i + batch]
+        yield boxes, [image if box == full else image.crop(box) for box in boxes]
+
+
+def merge_tile_detections(tile_boxes: list[Box], tile_rows: list[list[tuple]], width: int, height: int,
+                          iou: float = 0.5, metric: str = "ios", max_det: int = 1000) -> list[tuple]:
+    """Merge per-tile label rows into label rows for the whole image.
+
+    ``tile_rows`` holds ``(class_id, x, y, w, h, confidence)`` rows
+    normalised to their tile.
+    """
+    counts = [len(rows) for rows in tile_rows]
+    if not sum(counts):
+        return []
+    rows = np.array([row[:6] for tile in tile_rows for row in tile], dtype=np.float64)
+    origins = np.repeat(np.array(tile_boxes, dtype=np.float64), counts, axis=0)
+    sizes = origins[:, 2:] - origins[:, :2]
+
+    xywh = rows[:, 1:5] * np.hstack([sizes, sizes])
+    xywh[:, :2] += origins[:, :2]
+    boxes = xywh_to_xyxy(xywh)
+    classes = rows[:, 0].astype(np.int64)
+    scores = rows[:, 5]
+    keep = batched_nms(boxes, scores, classes, iou, metric)[:max_det]
+
+    merged = xyxy_to_xywh(boxes[keep]) / np.array([width, height, width, height], dtype=np.float64)
+    return [
+        (int(c), float(x), float(y), float(w), float(h), float(s))
+        for c, (x, y, w, h), s in zip(classes[keep], merged, scores[keep])
+    ]
+
+
+def predict_tiled(image: Image.Image, detect, tile: int = 1280, overlap: float = 0.2, batch: int = 8,
+                  iou: float = 0.5, metric: str = "ios", full_image: bool = False) -> list[tuple]:
+    """Run ``detect`` over the tiles of ``image`` and return merged label rows.
+
+    ``detect`` takes a list of PIL images and returns one list of normalised
+    label rows per image.
+    """
+    grid = tile_grid(image.width, image.height, tile, overlap, full_image)
+    tile_boxes, tile_rows = [], []
+    for boxes, crops in iter_tile_batches(image, grid, batch):
+        tile_boxes.extend(boxes)
+        tile_rows.extend(detect(crops))
+    return merge_tile_detections(tile_boxes, tile_rows, image.width, image.height, iou, metric)
@@ -1,7 +1,8 @@
 import os
 import json
-from ultralytics import YOLO
 import yaml
+from .dataset_cache import check_cache_size
+from .device import resolve_device
 from .utils import emit_status, ensure_dir
 
 
@@ -19,6 +20,8 @@ def run_training(cfg):
     project = os.path.dirname(output)
     name = os.path.basename(output)
 
+    from ultralytics import YOLO
+
     model = YOLO(model_path)
 
     with open(data, 'r') as f:
@@ -31,6 +34,7 @@ def run_training(cfg):
     emit_status('class_map_saved', path=source_classmap_path)
 
     class_map_final_path = os.path.join(output, "class_map.json")
+    check_cache_size(data, imgsz)
 
     model.train(
         data=data,
@@ -39,7 +43,7 @@ def run_training(cfg):
         imgsz=imgsz,
         project=project,
         name=name,
-        device=0,
+        device=resolve_device(cfg.get('device')),
     )
 
     with open(class_map_final_path, "w") as f:
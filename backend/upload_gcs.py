@@ -2,6 +2,7 @@ import subprocess
 import os
 import sys
 import json
+from .shards import pack, resolve_shards_option
 from .utils import emit_status
 
 
@@ -38,6 +39,36 @@ def _env_bool(name: str, default: bool = False) -> bool:
     return value.lower() in {"1", "true", "yes", "on"}
 
 
+def _upload_native(config, local_path, gcs_path, dry_run, delete_extras):
+    """Sync through :func:`backend.storage.sync` instead of ``gsutil``."""
+    from .manifest import default_manifest_path, resolve_manifest_path
+    from .storage import open_storage, sync
+
+    storage = open_storage(gcs_path)
+    manifest_path = (
+        resolve_manifest_path(config.get("manifest"), "upload", gcs_path)
+        or default_manifest_path("upload", gcs_path)
+    )
+    try:
+        result = sync(
+            local_path,
+            storage,
+            manifest_path,
+            dry_run=dry_run,
+            delete_extras=delete_extras,
+            workers=config.get("workers", 8),
+            retries=config.get("retries", 3),
+            remote_listing=config.get("remote_listing", False),
+        )
+    except Exception as e:
+        emit_status('error', action='upload_gcs', message=str(e))
+        return
+    if result["failed"]:
+        emit_status('error', action='upload_gcs', message=f"{result['failed']} files failed", **result)
+    else:
+        emit_status('complete', action='upload_gcs', **result)
+
+
 def upload(config):
     local_path = os.path.expanduser(config["local_path"])
     gcs_path = config["gcs_path"]
@@ -47,6 +78,21 @@ def upload(config):
     )
     emit_status("start", action="upload_gcs", source=local_path, destination=gcs_path)
 
+    shards = resolve_shards_option(config.get("shards"), local_path)
+    if shards is not None:
+        # Ship a few large shards instead of one object per image and label.
+        results = pack(local_path, shards["dir"], shards["shard_size"], shards["workers"])
+        emit_status("shards_packed", path=str(shards["dir"]), shards=len(results),
+                    changed=sum(r["changed"] for r in results))
+        local_path = str(shards["dir"])
+
+    engine = config.get("engine", os.getenv("UPLOAD_GCS_ENGINE", "gsutil"))
+    if engine == "native":
+        _upload_native(config, local_path, gcs_path, dry_run, delete_extras)
+        return
+    if engine != "gsutil":
+        raise ValueError(f"Unknown upload engine: {engine}")
+
     cmd = build_rsync_command(
         local_path, gcs_path, dry_run=dry_run, delete_extras=delete_extras
     )
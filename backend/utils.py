@@ -1,9 +1,9 @@
-import json
-import sys
+import hashlib
+import os
 from pathlib import Path
 from typing import Any, Callable, Optional
 
-_status_callback: Optional[Callable[[str, dict], None]] = None
+from .events import bus
 
 
 def ensure_dir(path: str | Path) -> None:
@@ -11,16 +11,47 @@ def ensure_dir(path: str | Path) -> None:
     Path(path).mkdir(parents=True, exist_ok=True)
 
 
+def file_digest(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """Return a fast BLAKE2b content hash of ``path`` as a hex string."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def index_by_stem(directory: str | Path, extensions: tuple[str, ...]) -> dict[str, Path]:
+    """Scan ``directory`` once and map each file stem to its preferred file.
+
+    ``extensions`` are matched case-insensitively and listed in order of
+    preference; for equal extensions a lower-case suffix wins.
+    """
+    ranks = {ext.lower(): i for i, ext in enumerate(extensions)}
+    index: dict[str, Path] = {}
+    best: dict[str, tuple[int, bool]] = {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            stem, ext = os.path.splitext(entry.name)
+            rank = ranks.get(ext.lower())
+            if rank is None or not entry.is_file():
+                continue
+            key = (rank, ext != ext.lower())
+            if stem not in best or key < best[stem]:
+                best[stem] = key
+                index[stem] = Path(entry.path)
+    return index
+
+
 def set_status_callback(cb: Optional[Callable[[str, dict], None]]) -> None:
     """Register a callback invoked whenever :func:`emit_status` is called."""
-    global _status_callback
-    _status_callback = cb
+    bus.set_callback(cb)
 
 
 def emit_status(event: str, **data: Any) -> None:
-    """Emit a JSON status message to stdout and invoke the status callback."""
-    payload = {"event": event, **data}
-    print(json.dumps(payload))
-    sys.stdout.flush()
-    if _status_callback is not None:
-        _status_callback(event, data)
+    """Publish a status event on the :data:`~backend.events.bus`.
+
+    Subscribers and the status callback see every event; the JSON output on
+    stdout (or ``WORKFLOW_STATUS_FD``) folds per-file events into periodic
+    ``summary`` events.
+    """
+    bus.publish(event, data)
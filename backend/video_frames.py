@@ -0,0 +1,83 @@
+"""Frame-accurate extraction of selected video frames.
+
+The wanted frames are decoded in one forward pass over the video. Short gaps
+are stepped over with ``grab()``, which skips the colour conversion of the
+frames in between; longer gaps seek with ``CAP_PROP_POS_FRAMES`` so the
+decoder restarts from the nearest keyframe instead of decoding everything in
+between. Seeks are checked against the reported position, and a video that
+does not seek accurately is read sequentially instead. JPEG encoding and
+writing run on a thread pool while the next frames are decoded.
+
+Frames are numbered from 1, like the ``<video stem>_<frame>`` labels of
+ultralytics.
+"""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+
+def iter_selected_frames(video_path: str | Path, frames, seek_gap: int = 120):
+    """Yield ``(frame_number, bgr_frame)`` for the wanted ``frames`` in order.
+
+    Frames past the end of the video are not yielded.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(str(video_path))
+    seekable = True
+    position = 0  # index of the next frame ``read()`` returns
+    try:
+        for frame in sorted(set(frames)):
+            index = frame - 1
+            if index < position:
+                continue
+            if seekable and index - position > seek_gap:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) == index:
+                    position = index
+                else:
+                    logging.warning(f"Inaccurate seeking in {video_path}; reading it sequentially")
+                    seekable = False
+                    capture.release()
+                    capture = cv2.VideoCapture(str(video_path))
+                    position = 0
+            while position < index:
+                if not capture.grab():
+                    return
+                position += 1
+            ok, bgr = capture.read()
+            if not ok:
+                return
+            position += 1
+            yield frame, bgr
+    finally:
+        capture.release()
+
+
+def extract_frames(video_path: str | Path, targets: dict[int, Path], workers: int = 4, quality: int = 95,
+                   seek_gap: int = 120) -> set[int]:
+    """Save the frames in ``targets`` (frame number -> JPEG path); return those written.
+
+    At most ``2 * workers`` decoded frames wait for the writer threads.
+    """
+    import cv2
+
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+    def save(frame, bgr):
+        path = Path(targets[frame])
+        if not cv2.imwrite(str(path), bgr, params):
+            raise OSError(f"Could not write {path}")
+        return frame
+
+    written = set()
+    pending = set()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for frame, bgr in iter_selected_frames(video_path, targets, seek_gap):
+            pending.add(pool.submit(save, frame, bgr))
+            if len(pending) >= 2 * max(1, workers):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                written.update(f.result() for f in done)
+        written.update(f.result() for f in pending)
+    return written
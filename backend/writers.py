@@ -0,0 +1,75 @@
+"""Incremental JSON and NDJSON output for large result sets."""
+
+import gzip
+import json
+from pathlib import Path
+
+FORMATS = ("json", "ndjson")
+
+
+class RecordWriter:
+    """Write records one at a time to a JSON array or NDJSON file.
+
+    The ``json`` format produces the same text as ``json.dump(records,
+    indent=2)`` without holding the records in memory. The ``ndjson`` format
+    writes one compact record per line and is flushed every
+    ``flush_every`` records, so readers can follow the file while it grows.
+    """
+
+    def __init__(self, path: str | Path, fmt: str = "json", compress: bool = False,
+                 indent: int | None = 2, flush_every: int = 100):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.path = Path(path)
+        self.fmt = fmt
+        self.indent = indent
+        self.flush_every = flush_every
+        self.count = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if compress:
+            self._f = gzip.open(self.path, "wt", encoding="utf-8")
+        else:
+            self._f = open(self.path, "w", encoding="utf-8")
+
+    def write(self, record) -> None:
+        if self.fmt == "ndjson":
+            self._f.write(json.dumps(record))
+            self._f.write("\n")
+        else:
+            self._f.write("[\n" if self.count == 0 else ",\n")
+            text = json.dumps(record, indent=self.indent)
+            if self.indent:
+                pad = " " * self.indent
+                text = pad + text.replace("\n", "\n" + pad)
+            self._f.write(text)
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._f.flush()
+
+    def close(self) -> None:
+        if self.fmt == "json":
+            self._f.write("\n]" if self.count else "[]")
+        self._f.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_record_writer(path: str | Path, fmt: str | None = None, compress: bool | None = None) -> RecordWriter:
+    """Open a :class:`RecordWriter`, inferring unset options from ``path``.
+
+    A ``.gz`` suffix enables gzip compression and a ``.ndjson``/``.jsonl``
+    suffix (before any ``.gz``) selects the NDJSON format.
+    """
+    path = Path(path)
+    suffixes = [s.lower() for s in path.suffixes]
+    gz = suffixes[-1:] == [".gz"]
+    if compress is None:
+        compress = gz
+    if fmt is None:
+        data_suffixes = suffixes[:-1] if gz else suffixes
+        fmt = "ndjson" if data_suffixes[-1:] in ([".ndjson"], [".jsonl"]) else "json"
+    return RecordWriter(path, fmt=fmt, compress=compress)
@@ -1,17 +1,250 @@
 import os
 import sys
 import json
-from ultralytics import YOLO
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from .database import open_database
+from .device import resolve_device
+from .model_cache import default_cache
 from .utils import emit_status, set_status_callback
 
 
-def run_prediction(cfg, db=None, batch: int = 1):
+@contextmanager
+def _model_lease(model_path, model=None, use_cache=True):
+    """Yield the given ``model``, a cached one, or a freshly loaded one."""
+    if model is not None:
+        yield model
+    elif use_cache:
+        with default_cache.lease(model_path) as (cached, hit):
+            emit_status('model_cache', hit=hit, **default_cache.stats())
+            yield cached
+    else:
+        from ultralytics import YOLO
+
+        yield YOLO(model_path)
+
+
+def _result_rows(result) -> list[tuple]:
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+    return [
+        (int(c), *xywh, conf)
+        for c, xywh, conf in zip(boxes.cls.tolist(), boxes.xywhn.tolist(), boxes.conf.tolist())
+    ]
+
+
+def _predict_saved(model, cfg, source, batch: int, device, sink=None) -> None:
+    """Let ultralytics predict ``source`` into ``cfg['output']``.
+
+    Labels go to ``labels/*.txt`` via ``save_txt``, or to ``sink`` (see
+    :func:`~backend.result_store.open_label_sink`) when one is given, in
+    which case rendering follows ``cfg['save']`` and is off by default for
+    a result store.
+    """
+    from .sources import is_video
+
+    output = Path(cfg['output'])
+    results = model.predict(
+        source=source,
+        save=cfg.get('save', not cfg.get('result_store')),
+        save_txt=sink is None,
+        save_conf=cfg.get('save_conf', False),
+        conf=cfg.get('conf', 0.25),
+        imgsz=cfg.get('imgsz', 640),
+        project=str(output.parent),
+        name=output.name,
+        exist_ok=True,
+        device=device,
+        stream=True,
+        batch=batch,
+    )
+    frames = {}
+    for r in results:
+        path = getattr(r, 'path', '')
+        if sink is None:
+            emit_status('prediction', file=path, detections=len(getattr(r, 'boxes', [])))
+            continue
+        rows = _result_rows(r)
+        frame = None
+        if is_video(path):
+            # Video results arrive in order; ultralytics numbers frames from 1.
+            frame = frames[path] = frames.get(path, 0) + 1
+        sink.add(path, frame, rows)
+        emit_status('prediction', file=path, detections=len(rows))
+
+
+def _predict_prefetched(model, cfg, images, batch: int, device, sink) -> None:
+    """Predict still ``images`` fed by a :class:`~backend.prefetch.PrefetchPipeline`."""
+    from .prefetch import PrefetchPipeline
+
+    options = cfg['prefetch'] if isinstance(cfg['prefetch'], dict) else {}
+    output = Path(cfg['output'])
+    conf = cfg.get('conf', 0.25)
+    imgsz = cfg.get('imgsz', 640)
+    save = cfg.get('save', not cfg.get('result_store'))
+
+    pipeline = PrefetchPipeline(
+        images,
+        batch_size=batch,
+        max_size=imgsz,
+        workers=options.get('workers', 4),
+        max_batches=options.get('batches', 4),
+    )
+    last_report = time.monotonic()
+    for item in pipeline:
+        results = model.predict(source=item.images, conf=conf, imgsz=imgsz, device=device, verbose=False)
+        for path, r in zip(item.paths, results):
+            rows = _result_rows(r)
+            sink.add(path, None, rows)
+            if save:
+                r.save(filename=str(output / path.name))
+            emit_status('prediction', file=str(path), detections=len(rows))
+        if time.monotonic() - last_report >= 1.0:
+            emit_status('prefetch', **pipeline.stats())
+            last_report = time.monotonic()
+    emit_status('prefetch', **pipeline.stats())
+
+
+def _predict_tiled(model, cfg, images, device, sink) -> None:
+    """Predict still ``images`` tile by tile and record full-image labels."""
+    from .prefetch import PrefetchPipeline, load_image
+    from .tiling import predict_tiled
+
+    options = cfg['tiling'] if isinstance(cfg['tiling'], dict) else {}
+    tile = options.get('tile', 1280)
+    conf = cfg.get('conf', 0.25)
+
+    def detect(crops):
+        results = model.predict(source=crops, conf=conf, imgsz=tile, device=device, verbose=False)
+        return [_result_rows(r) for r in results]
+
+    if cfg.get('prefetch'):
+        # Full-resolution images are large, so only decode a couple ahead.
+        prefetch = cfg['prefetch'] if isinstance(cfg['prefetch'], dict) else {}
+        pipeline = PrefetchPipeline(images, workers=prefetch.get('workers', 2), max_batches=prefetch.get('batches', 1))
+        decoded = ((item.paths[0], item.images[0]) for item in pipeline)
+    else:
+        decoded = ((path, load_image(path)) for path in images)
+
+    for path, image in decoded:
+        rows = predict_tiled(
+            image,
+            detect,
+            tile=tile,
+            overlap=options.get('overlap', 0.2),
+            batch=options.get('batch', 8),
+            iou=options.get('iou', 0.5),
+            metric=options.get('metric', 'ios'),
+            full_image=options.get('full_image', False),
+        )
+        sink.add(path, None, rows)
+        emit_status('prediction', file=str(path), detections=len(rows))
+
+
+def _predict_gated_video(model, cfg, video: Path, batch: int, device, sink) -> None:
+    """Predict ``video`` running the model only on frames with motion."""
+    from .motion import MotionGate, gated_predictions
+
+    options = cfg['motion_gate'] if isinstance(cfg['motion_gate'], dict) else {}
+    gate = MotionGate(
+        threshold=options.get('threshold', 4.0),
+        keyframe_interval=options.get('keyframe_interval', 30),
+        width=options.get('width', 64),
+    )
+
+    def detect(frames):
+        results = model.predict(source=frames, conf=cfg.get('conf', 0.25), imgsz=cfg.get('imgsz', 640),
+                                device=device, verbose=False)
+        return [_result_rows(r) for r in results]
+
+    inferred = skipped = 0
+    for record in gated_predictions(video, detect, sink, gate, Path(cfg['output']), batch):
+        if record.inferred:
+            inferred += 1
+            emit_status('prediction', file=str(video), frame=record.frame, detections=record.detections)
+        else:
+            skipped += 1
+            emit_status('frame_skipped', file=str(video), frame=record.frame, score=record.score,
+                        source_frame=record.source_frame, detections=record.detections)
+    total = inferred + skipped
+    emit_status('motion_gate', file=str(video), frames=total, inferred=inferred, skipped=skipped,
+                skip_ratio=round(skipped / total, 3) if total else 0.0)
+
+
+def _predict_sources(model, cfg, batch: int, device) -> dict:
+    """Split the source into stills and videos for the optional prediction modes.
+
+    Returns the result cache statistics, or an empty dict without a cache.
+    """
+    from .result_cache import CachingSink, open_result_cache, serve_cached
+    from .result_store import ResultWriter, open_label_sink
+    from .sources import is_video, list_sources
+
+    paths = list_sources(cfg['source'])
+    images = [p for p in paths if not is_video(p)]
+    sink = open_label_sink(cfg)
+    store = sink if isinstance(sink, ResultWriter) else None
+    cache = open_result_cache(cfg.get('result_cache'))
+    stills = sink
+    try:
+        if images and cache is not None:
+            images, keys = serve_cached(cache, cfg, images, sink)
+            stills = CachingSink(cache, keys, sink)
+        if images and cfg.get('tiling'):
+            _predict_tiled(model, cfg, images, device, stills)
+        elif images and cfg.get('prefetch'):
+            _predict_prefetched(model, cfg, images, batch, device, stills)
+        elif images:
+            recorder = stills if store is not None or cache is not None else None
+            _predict_saved(model, cfg, [str(p) for p in images], batch, device, recorder)
+        for video in (p for p in paths if is_video(p)):
+            if cfg.get('motion_gate'):
+                _predict_gated_video(model, cfg, video, batch, device, sink)
+            else:
+                _predict_saved(model, cfg, str(video), batch, device, store)
+    finally:
+        sink.close()
+        if cache is not None:
+            cache.close()
+    if store is not None:
+        emit_status('result_store', path=str(store.path), frames=store.frames, detections=store.rows)
+    return cache.stats() if cache is not None else {}
+
+
+def run_prediction(cfg, db=None, batch: int = 1, model=None):
+    """Run ``model.predict`` over ``cfg['source']``.
+
+    ``model`` may be an already loaded ``YOLO`` instance for
+    ``cfg['model']``. When omitted the model comes from the process-wide
+    :data:`~backend.model_cache.default_cache` unless ``cfg['model_cache']``
+    is false.
+
+    ``cfg['device']`` defaults to ``"auto"`` (see
+    :func:`~backend.device.resolve_device`). With ``cfg['engine']`` set to
+    ``"onnx"`` the model is exported and run on the CPU through
+    :func:`~backend.onnx_engine.predict_onnx` instead. ``cfg['prefetch']``
+    (``true`` or ``{"workers": ..., "batches": ...}``) decodes still images
+    ahead of inference on a thread pool, and ``cfg['motion_gate']`` (``true``
+    or ``{"threshold": ..., "keyframe_interval": ...}``) skips inference on
+    video frames without motion. ``cfg['tiling']`` predicts large stills
+    as overlapping tiles. ``cfg['result_store']`` collects the detections in
+    one :mod:`~backend.result_store` file instead of per-frame label files.
+    ``cfg['result_cache']`` serves still images seen before with the same
+    weights and parameters from a :mod:`~backend.result_cache`; the
+    ``complete`` event then reports the hit rate.
+    """
     model_path = cfg['model']
     source = cfg['source']
     output = cfg['output']
     conf = cfg.get('conf', 0.25)
+    engine = cfg.get('engine', 'ultralytics')
+    if engine not in ('ultralytics', 'onnx'):
+        raise ValueError(f"Unknown prediction engine: {engine}")
+    device = 'cpu' if engine == 'onnx' else resolve_device(cfg.get('device'))
 
-    emit_status('start', action='predict', model=model_path, source=source)
+    emit_status('start', action='predict', model=model_path, source=source, engine=engine, device=device)
 
     job_id = None
     if db is not None:
@@ -27,7 +260,7 @@ def run_prediction(cfg, db=None, batch: int = 1):
 
         def _cb(event: str, data: dict) -> None:
             nonlocal processed
-            if event == 'prediction':
+            if event in ('prediction', 'frame_skipped'):
                 processed += 1
                 db.updatePrediction(job_id, {'results_count': processed})
             elif event == 'complete':
@@ -43,21 +276,36 @@ def run_prediction(cfg, db=None, batch: int = 1):
     project = os.path.dirname(output)
     name = os.path.basename(output)
 
-    model = YOLO(model_path)
-    results = model.predict(
-        source=source,
-        save=True,
-        save_txt=True,
-        conf=conf,
-        project=project,
-        name=name,
-        device=0,
-        stream=True,
-        batch=batch,
-    )
+    cache_stats = {}
+    if engine == 'onnx':
+        from .onnx_engine import predict_onnx
+        from .result_cache import open_result_cache
+        cache = open_result_cache(cfg.get('result_cache'))
+        try:
+            predict_onnx(cfg, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+        cache_stats = cache.stats() if cache is not None else {}
+    elif any(cfg.get(key) for key in ('prefetch', 'motion_gate', 'tiling', 'result_store', 'result_cache')):
+        with _model_lease(model_path, model, cfg.get('model_cache', True)) as model:
+            cache_stats = _predict_sources(model, cfg, batch, device)
+    else:
+        with _model_lease(model_path, model, cfg.get('model_cache', True)) as model:
+            results = model.predict(
+                source=source,
+                save=True,
+                save_txt=True,
+                conf=conf,
+                project=project,
+                name=name,
+                device=device,
+                stream=True,
+                batch=batch,
+            )
 
-    for r in results:
-        emit_status('prediction', file=getattr(r, 'path', ''), detections=len(getattr(r, 'boxes', [])))
+            for r in results:
+                emit_status('prediction', file=getattr(r, 'path', ''), detections=len(getattr(r, 'boxes', [])))
 
     if cfg.get('convert_to_ls'):
         emit_status('conversion_start')
@@ -68,7 +316,7 @@ def run_prediction(cfg, db=None, batch: int = 1):
         except Exception as e:
             emit_status('conversion_error', error=str(e))
 
-    emit_status('complete', action='predict')
+    emit_status('complete', action='predict', **cache_stats)
 
     if db is not None:
         set_status_callback(None)
@@ -107,8 +355,13 @@ def run_training(cfg, db=None):
     project = os.path.dirname(output)
     name = os.path.basename(output)
 
+    from .dataset_cache import check_cache_size
+    from ultralytics import YOLO
+
+    check_cache_size(data_yaml, imgsz)
     model = YOLO(model_path)
-    model.train(data=data_yaml, epochs=epochs, batch=batch, imgsz=imgsz, project=project, name=name, save=True, plots=True)
+    model.train(data=data_yaml, epochs=epochs, batch=batch, imgsz=imgsz, project=project, name=name, save=True, plots=True,
+                device=resolve_device(cfg.get('device')))
 
     emit_status('complete', action='train')
 
@@ -122,12 +375,17 @@ def run(config_path: str, mode_override: str | None = None, db=None) -> None:
     if mode_override:
         cfg["mode"] = mode_override
     mode = cfg.get("mode")
-    if mode == "predict":
-        run_prediction(cfg, db=db, batch=cfg.get('batch', 1))
-    elif mode == "train":
-        run_training(cfg, db=db)
-    else:
+    if mode not in ("predict", "train"):
         raise ValueError("'mode' must be either 'predict' or 'train'")
+    owned = open_database(cfg.get("database")) if db is None else None
+    try:
+        if mode == "predict":
+            run_prediction(cfg, db=db or owned, batch=cfg.get('batch', 1))
+        else:
+            run_training(cfg, db=db or owned)
+    finally:
+        if owned is not None:
+            owned.close()
 
 
 def main(argv: list[str] | None = None, mode_override: str | None = None) -> None:
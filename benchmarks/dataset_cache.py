@@ -0,0 +1,121 @@
+"""Epoch time with and without the dataset cache.
+
+Usage::
+
+    python -m benchmarks.dataset_cache [--images 200] [--size 4000x3000] [--imgsz 640]
+                                       [--epochs 3] [--model yolov8n.pt] [--output results.json]
+
+Synthetic JPEGs with labels are written to a temporary ``images``/``labels``
+tree and :func:`~backend.generate_data_yaml.generate_data_yaml` is run with
+and without ``dataset_cache``. Each epoch replays the image loading of the
+ultralytics data loader (full decode, then resize of the longer side to
+``imgsz``) over the ``train`` directory of the resulting ``data.yaml``. With
+``--model`` each ``data.yaml`` is also trained for ``--epochs`` real epochs.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from backend.generate_data_yaml import generate_data_yaml
+from backend.sources import IMAGE_EXTENSIONS
+
+
+def make_dataset(root: Path, count: int, size: tuple[int, int]) -> None:
+    rng = np.random.default_rng(0)
+    for split in ("train", "val"):
+        (root / split / "images").mkdir(parents=True)
+        (root / split / "labels").mkdir(parents=True)
+    # Low-frequency noise compresses like a photo rather than like flat colour.
+    base = rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+    for i in range(count):
+        split = "val" if i % 10 == 0 else "train"
+        image = Image.fromarray(np.roll(base, i, axis=1)).resize(size, Image.BILINEAR)
+        image.save(root / split / "images" / f"img_{i:05d}.jpg", quality=90)
+        (root / split / "labels" / f"img_{i:05d}.txt").write_text("0 0.5 0.5 0.2 0.2\n")
+    (root / "classes.txt").write_text("object\n")
+
+
+def load_like_trainer(path: Path, imgsz: int) -> tuple[int, int]:
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+    scale = imgsz / max(image.size)
+    if scale != 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.BILINEAR)
+    return image.size
+
+
+def train_images(images_dir: Path) -> list[Path]:
+    return [p for p in sorted(images_dir.rglob("*")) if p.suffix.lower() in IMAGE_EXTENSIONS]
+
+
+def loader_epoch(paths: list[Path], imgsz: int, workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda p: load_like_trainer(p, imgsz), paths))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size", default="4000x3000")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--model")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_dataset(root, args.images, size)
+        for mode in ("uncached", "cached"):
+            cfg = {
+                "classes_file": str(root / "classes.txt"),
+                "output_file": str(root / mode / "data.yaml"),
+                "train_images": str(root / "train" / "images"),
+                "val_images": str(root / "val" / "images"),
+            }
+            if mode == "cached":
+                cfg["dataset_cache"] = {"imgsz": args.imgsz, "workers": args.workers}
+            start = time.perf_counter()
+            data = generate_data_yaml(cfg)
+            build = time.perf_counter() - start
+            paths = train_images(Path(data["train"]))
+            epochs = [loader_epoch(paths, args.imgsz, args.workers) for _ in range(args.epochs)]
+            result = {"mode": mode, "images": args.images, "size": args.size, "imgsz": args.imgsz,
+                      "build_seconds": round(build, 3), "epoch_seconds": [round(e, 3) for e in epochs]}
+            if args.model:
+                from ultralytics import YOLO
+
+                start = time.perf_counter()
+                YOLO(args.model).train(data=cfg["output_file"], epochs=args.epochs, imgsz=args.imgsz,
+                                       project=str(root / "runs"), name=mode, plots=False)
+                result["train_seconds"] = round(time.perf_counter() - start, 3)
+            results.append(result)
+            print(f"{mode:<9} build {build:8.3f}s  epoch {min(epochs):8.3f}s "
+                  f"{len(paths) / min(epochs):10.1f} images/s")
+
+        # A second build finds every image unchanged.
+        start = time.perf_counter()
+        generate_data_yaml(cfg)
+        results.append({"mode": "rebuild", "build_seconds": round(time.perf_counter() - start, 3)})
+        print(f"rebuild   build {results[-1]['build_seconds']:8.3f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare per-event and batched progress writes to the workflow database.
+
+Usage::
+
+    python -m benchmarks.db_writes [--frames 20000] [--output results.json]
+
+Each mode replays the writes of one prediction job: a ``createPrediction``,
+one ``updatePrediction`` per frame and an activity log row every 100 frames.
+``per-event`` commits every write on its own (``flush_count=1``), ``batched``
+uses the default :class:`~backend.database.WorkflowDatabase` flush policy.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from backend.database import WorkflowDatabase
+
+MODES = {
+    "per-event": {"flush_count": 1, "flush_interval": 0.0},
+    "batched": {},
+}
+
+
+def replay(db: WorkflowDatabase, frames: int) -> None:
+    job_id = db.createPrediction({
+        "model_name": "model.pt",
+        "source_path": "clip.avi",
+        "output_path": "out",
+        "confidence_threshold": 0.25,
+        "status": "running",
+    })
+    for frame in range(1, frames + 1):
+        db.updatePrediction(job_id, {"results_count": frame})
+        if frame % 100 == 0:
+            db.logActivity({"action": "predict_progress", "details": json.dumps({"frame": frame}), "status": "info"})
+    db.updatePrediction(job_id, {"status": "complete", "results_count": frames})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, options in MODES.items():
+            db = WorkflowDatabase(Path(tmp) / f"{mode}.db", **options)
+            start = time.perf_counter()
+            replay(db, args.frames)
+            db.close()
+            elapsed = time.perf_counter() - start
+            results.append({"mode": mode, "frames": args.frames, "seconds": round(elapsed, 3),
+                            "events_per_sec": round(args.frames / elapsed, 1),
+                            "transactions": db.transactions})
+            print(f"{mode:<10} {elapsed:8.3f}s {args.frames / elapsed:12.1f} events/s "
+                  f"{db.transactions:8d} transactions")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Check that non-model backend commands start without heavy dependencies.
+
+Usage::
+
+    python -m benchmarks.import_time [--output results.json]
+
+Each module is imported in a fresh interpreter; the import time and any
+heavy packages it pulled in are reported. The script exits with status 1 if
+a non-model module imports one of :data:`HEAVY_MODULES`.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ("ultralytics", "torch", "torchvision", "cv2", "onnxruntime")
+
+NON_MODEL_MODULES = (
+    "backend",
+    "backend.collect_images",
+    "backend.convert_yolo_to_ls",
+    "backend.download_annotated",
+    "backend.generate_data_yaml",
+    "backend.index_predictions_by_class",
+    "backend.detection_index",
+    "backend.stage_predictions_for_upload",
+    "backend.upload_gcs",
+    "backend.shards",
+    "backend.storage",
+    "backend.pipeline",
+    "backend.predict_server",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return {"module": module, **json.loads(out.stdout.strip().splitlines()[-1])}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = [measure(module) for module in NON_MODEL_MODULES]
+    failed = False
+    for r in results:
+        flag = f"  HEAVY: {', '.join(r['heavy'])}" if r["heavy"] else ""
+        print(f"{r['module']:<40} {r['seconds'] * 1000:8.1f} ms{flag}")
+        failed = failed or bool(r["heavy"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
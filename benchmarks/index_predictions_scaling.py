@@ -0,0 +1,86 @@
+"""Measure how ``index_predictions`` scales with the number of worker processes.
+
+Usage::
+
+    python -m benchmarks.index_predictions_scaling [--runs 4] [--frames 5000] [--output results.json]
+
+A synthetic tree of ``predict*/labels`` directories (each with an ``.avi``
+placeholder) is generated in a temporary directory and indexed once per
+worker count.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from backend.index_predictions_by_class import index_predictions
+
+
+def make_tree(root: Path, runs: int, frames: int, classes: int = 5, boxes: int = 3) -> None:
+    rng = random.Random(0)
+    for r in range(runs):
+        predict_dir = root / f"predict{r or ''}"
+        labels = predict_dir / "labels"
+        labels.mkdir(parents=True)
+        (predict_dir / "clip.avi").touch()
+        for frame in range(1, frames + 1):
+            lines = [
+                f"{rng.randrange(classes)} {rng.random():.4f} {rng.random():.4f} {rng.random():.4f} {rng.random():.4f}"
+                for _ in range(rng.randint(1, boxes))
+            ]
+            (labels / f"clip_{frame}.txt").write_text("\n".join(lines) + "\n")
+    with open(root / "class_map.json", "w") as f:
+        json.dump({str(i): f"class{i}" for i in range(classes)}, f)
+
+
+def worker_counts() -> list[int]:
+    cpus = os.cpu_count() or 1
+    counts, n = [], 1
+    while n < cpus:
+        counts.append(n)
+        n *= 2
+    counts.append(cpus)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(root, args.runs, args.frames)
+        files = args.runs * args.frames
+        for workers in worker_counts():
+            cfg = {
+                "source_dir": str(root),
+                "output_json": str(root / "index.json"),
+                "class_map": str(root / "class_map.json"),
+                "workers": workers,
+                "stream": True,
+            }
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                index_predictions(cfg)
+            elapsed = time.perf_counter() - start
+            results.append({"workers": workers, "files": files, "seconds": round(elapsed, 3),
+                            "files_per_sec": round(files / elapsed, 1)})
+            print(f"workers={workers:<3} {elapsed:8.3f}s {files / elapsed:10.1f} files/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
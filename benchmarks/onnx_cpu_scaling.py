@@ -0,0 +1,81 @@
+"""Measure ONNX Runtime CPU prediction throughput per core count.
+
+Usage::
+
+    python -m benchmarks.onnx_cpu_scaling --model yolov8n.pt [--images DIR] [--count 64] [--imgsz 640] [--output results.json]
+
+Without ``--images`` a directory of synthetic 1280x720 JPEGs is generated.
+For every core count the images are predicted once with a single session
+using that many intra-op threads and once sharded across that many worker
+processes with one thread each.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from backend.onnx_engine import export_onnx, predict_onnx
+from backend.sources import list_sources
+from benchmarks.index_predictions_scaling import worker_counts
+
+
+def make_images(directory: Path, count: int, size=(1280, 720)) -> None:
+    rng = random.Random(0)
+    for i in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new("RGB", size, color).save(directory / f"image_{i:05d}.jpg", quality=90)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--images")
+    parser.add_argument("--count", type=int, default=64)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        source = Path(args.images) if args.images else root / "images"
+        if not args.images:
+            source.mkdir()
+            make_images(source, args.count)
+        images = len(list_sources(source))
+        onnx_path = export_onnx(args.model, args.imgsz)
+
+        for cores in worker_counts():
+            for layout, workers, threads in (("threads", 1, cores), ("processes", cores, 1)):
+                if layout == "processes" and cores == 1:
+                    continue
+                cfg = {
+                    "model": str(onnx_path),
+                    "source": str(source),
+                    "output": str(root / f"out_{layout}_{cores}"),
+                    "imgsz": args.imgsz,
+                    "workers": workers,
+                    "threads": threads,
+                }
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    predict_onnx(cfg)
+                elapsed = time.perf_counter() - start
+                results.append({"cores": cores, "layout": layout, "images": images,
+                                "seconds": round(elapsed, 3), "images_per_sec": round(images / elapsed, 2)})
+                print(f"cores={cores:<3} {layout:<9} {elapsed:8.3f}s {images / elapsed:8.2f} images/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Wall time, throughput and peak memory of every backend stage.
+
+Usage::
+
+    python -m benchmarks.suite [--sizes 200,1000] [--stages collect,index,...] [--image-size 640x480]
+                               [--boxes 5] [--repeat 3] [--output results.json]
+                               [--compare baseline.json] [--threshold 0.2]
+
+For each size a synthetic dataset (see :mod:`benchmarks.synthetic`) is
+written to a temporary directory and each stage runs in its own process, so
+its peak RSS is measured in isolation. The model-bound ``predict`` stage runs
+against a stub model, so the suite works offline and without a GPU; it
+measures the decode, prefetch and label writing around inference. Training
+is not covered.
+
+``--output`` writes the results as JSON. ``--compare`` reads an earlier
+output and exits with status 1 when a stage got slower, or used more memory,
+by more than ``--threshold`` (a fraction) at any size. Differences under
+50 ms or 5 MB are ignored as noise.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+class _Values(list):
+    def tolist(self):
+        return list(self)
+
+
+class _Boxes:
+    def __init__(self, rows):
+        self.cls = _Values(r[0] for r in rows)
+        self.xywhn = _Values(list(r[1:5]) for r in rows)
+        self.conf = _Values(r[5] for r in rows)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class _Result:
+    def __init__(self, path, rows):
+        self.path = path
+        self.boxes = _Boxes(rows)
+
+
+class StubModel:
+    """Stands in for a ``YOLO`` model: fixed boxes, no inference."""
+
+    def predict(self, source, **kwargs):
+        sources = source if isinstance(source, list) else [source]
+        return [
+            _Result(getattr(s, "filename", str(s)), [(i % 5, 0.5, 0.5, 0.2, 0.2, 0.9) for i in range(3)])
+            for s in sources
+        ]
+
+
+def _count(path: Path, pattern: str = "*") -> int:
+    return sum(1 for p in path.rglob(pattern) if p.is_file())
+
+
+def _stages(root: Path, out: Path) -> dict:
+    """Stage name -> function running it and returning the number of files processed."""
+
+    def collect():
+        from backend.collect_images import collect_images
+
+        collect_images({"sources": [str(root / "sources" / "cam_a"), str(root / "sources" / "cam_b")],
+                        "destination": str(out / "collected"), "rename_only_on_conflict": True, "workers": 4})
+        return _count(root / "sources")
+
+    def download():
+        from backend.download_annotated import download_annotated
+
+        download_annotated({"labels_dir": str(root / "dataset" / "labels"),
+                            "images_dir": str(root / "dataset" / "images"),
+                            "output_dir": str(out / "annotated"), "workers": 4})
+        return _count(root / "dataset" / "labels")
+
+    def convert():
+        from backend.convert_yolo_to_ls import convert_yolo_to_ls
+
+        convert_yolo_to_ls({"labels_dir": str(root / "dataset" / "labels"),
+                            "image_dir": str(root / "dataset" / "images"),
+                            "classes_file": str(root / "classes.txt"),
+                            "output_file": str(out / "tasks.json")})
+        return _count(root / "dataset" / "labels")
+
+    def index():
+        from backend.index_predictions_by_class import index_predictions
+
+        index_predictions({"source_dir": str(root / "videos"), "output_json": str(out / "index.json"),
+                           "class_map": str(root / "class_map.json"), "workers": 4})
+        return _count(root / "videos", "*.txt")
+
+    def detection_index():
+        from backend.detection_index import build_detection_index
+
+        build_detection_index({"source_dir": str(root / "videos"), "index_db": str(out / "detections.db"),
+                               "class_map": str(root / "class_map.json")})
+        return _count(root / "videos", "*.txt")
+
+    def stage():
+        from backend.stage_predictions_for_upload import stage_predictions
+
+        stage_predictions({"prediction_dir": str(root / "stills" / "predict"),
+                           "destination": str(out / "staged")})
+        return _count(root / "stills" / "predict" / "labels")
+
+    def data_yaml(cache=False):
+        from backend.generate_data_yaml import generate_data_yaml
+
+        cfg = {"classes_file": str(root / "classes.txt"), "output_file": str(out / "data.yaml"),
+               "train_images": str(root / "dataset" / "images"), "val_images": str(root / "dataset" / "images")}
+        if cache:
+            cfg["dataset_cache"] = {"imgsz": 320, "workers": 4}
+        generate_data_yaml(cfg)
+        return _count(root / "dataset" / "images")
+
+    def predict():
+        from backend.yolo import run_prediction
+
+        run_prediction({"model": "stub.pt", "source": str(root / "dataset" / "images"),
+                        "output": str(out / "predict"), "device": "cpu", "save": False,
+                        "prefetch": {"workers": 4}}, batch=8, model=StubModel())
+        return _count(root / "dataset" / "images")
+
+    def shards():
+        from backend.shards import pack
+
+        pack(root / "dataset", out / "shards")
+        return _count(root / "dataset")
+
+    def upload():
+        from backend.upload_gcs import upload
+
+        upload({"local_path": str(root / "dataset"), "gcs_path": str(out / "bucket"), "engine": "native",
+                "manifest": str(out / "upload.db")})
+        return _count(root / "dataset")
+
+    return {
+        "collect": collect,
+        "download": download,
+        "convert": convert,
+        "index": index,
+        "detection-index": detection_index,
+        "stage": stage,
+        "data-yaml": data_yaml,
+        "data-yaml-cache": lambda: data_yaml(cache=True),
+        "predict": predict,
+        "shards": shards,
+        "upload": upload,
+    }
+
+
+STAGES = list(_stages(Path("."), Path(".")))
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of this process.
+
+    ``ru_maxrss`` keeps the size of the forking parent across ``exec`` on
+    Linux, so the high-water mark of the process's own memory is read from
+    ``/proc`` where it exists.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+def _run_stage(name: str, root: Path, out: Path, result_path: Path) -> None:
+    """Child process: run one stage and write its measurements to ``result_path``."""
+    func = _stages(root, out)[name]
+    start = time.perf_counter()
+    files = func()
+    seconds = time.perf_counter() - start
+    result_path.write_text(json.dumps({"seconds": seconds, "files": files, "peak_rss_mb": _peak_rss_mb()}))
+
+
+def measure(name: str, root: Path, out: Path) -> dict:
+    """Run stage ``name`` in a child process; return seconds, files/sec and peak RSS."""
+    result_path = out / f"{name}.result.json"
+    env = dict(os.environ, DATA_DIR=str(out / "data"))
+    # Stage events go to stdout; only the result file matters here.
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--run-stage", name, "--root", str(root), "--out", str(out),
+         "--result", str(result_path)],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    if proc.returncode != 0 or not result_path.exists():
+        return {"stage": name, "error": f"exit status {proc.returncode}"}
+    result = json.loads(result_path.read_text())
+    seconds = result["seconds"]
+    return {
+        "stage": name,
+        "files": result["files"],
+        "seconds": round(seconds, 4),
+        "files_per_sec": round(result["files"] / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(result["peak_rss_mb"], 1),
+    }
+
+
+# Changes below these are noise, whatever the relative change.
+_NOISE = {"seconds": 0.05, "peak_rss_mb": 5.0}
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Return a line per stage and size that regressed against ``baseline``."""
+    previous = {(r["stage"], r["size"]): r for r in baseline if "error" not in r}
+    regressions = []
+    for r in results:
+        old = previous.get((r["stage"], r["size"]))
+        if old is None or "error" in r:
+            continue
+        for key in ("seconds", "peak_rss_mb"):
+            if old[key] and r[key] > old[key] * (1 + threshold) and r[key] - old[key] > _NOISE[key]:
+                regressions.append(f"{r['stage']} @ {r['size']}: {key} {old[key]} -> {r[key]} "
+                                   f"(+{(r[key] / old[key] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="200,1000", help="comma separated image counts")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--image-size", default="640x480")
+    parser.add_argument("--boxes", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is kept")
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        _run_stage(args.run_stage, Path(args.root), Path(args.out), Path(args.result))
+        return
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    image_size = tuple(int(v) for v in args.image_size.lower().split("x"))
+    # Imported here so the stage processes do not load numpy and PIL up front.
+    from benchmarks.synthetic import make_dataset
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp) / "data"
+            start = time.perf_counter()
+            make_dataset(root, size, image_size, args.boxes)
+            print(f"--- {size} images (generated in {time.perf_counter() - start:.1f}s)")
+            for name in stages:
+                runs = []
+                for attempt in range(max(1, args.repeat)):
+                    # A fresh output directory each time, so no run finds the previous one's work.
+                    out = Path(tmp) / f"out-{name}-{attempt}"
+                    out.mkdir()
+                    runs.append(measure(name, root, out))
+                ok = [r for r in runs if "error" not in r]
+                result = min(ok, key=lambda r: r["seconds"]) if ok else runs[0]
+                result = {**result, "size": size}
+                results.append(result)
+                if "error" in result:
+                    print(f"{name:<16} {result['error']}")
+                else:
+                    print(f"{name:<16} {result['seconds']:9.3f}s {result['files_per_sec'] or 0:10.1f} files/s "
+                          f"{result['peak_rss_mb']:8.1f} MB")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "image_size": args.image_size,
+        "boxes": args.boxes,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = any("error" in r for r in results)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Synthetic datasets for the benchmarks.
+
+:func:`make_dataset` writes, below ``root``:
+
+``sources/cam_a``, ``sources/cam_b``
+    Collect sources. ``duplicates`` of the images of ``cam_a`` also exist in
+    ``cam_b`` under the same name, half with identical and half with
+    different content, so ``collect_images`` has to resolve conflicts.
+``dataset/images``, ``dataset/labels``
+    ``images`` JPEGs of ``size`` with ``boxes`` YOLO boxes each.
+``stills/predict``
+    A prediction run over stills: JPEGs next to ``labels/``.
+``videos/predict*``
+    Video prediction runs: ``labels/clip_<frame>.txt`` plus an ``.avi``
+    placeholder each.
+``classes.txt``, ``class_map.json``
+"""
+
+import io
+import json
+import os
+import random
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+def _jpeg_bytes(size: tuple[int, int], seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    # Upscaled noise compresses like a photo rather than like flat colour.
+    small = rng.integers(0, 256, (max(1, size[1] // 16), max(1, size[0] // 16), 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(small).resize(size, Image.BILINEAR).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+class _Images:
+    """Unique JPEG files from a few encoded bases.
+
+    Decoders stop at the end-of-image marker, so appending a unique trailer
+    gives every file its own content digest without encoding each one.
+    """
+
+    def __init__(self, size: tuple[int, int], variants: int = 8):
+        self.bases = [_jpeg_bytes(size, seed) for seed in range(variants)]
+
+    def write(self, path: Path, n: int) -> None:
+        path.write_bytes(self.bases[n % len(self.bases)] + f"#{n}".encode())
+
+
+def _label_text(rng: random.Random, boxes: int, classes: int) -> str:
+    lines = []
+    for _ in range(boxes):
+        w, h = rng.uniform(0.02, 0.3), rng.uniform(0.02, 0.3)
+        x, y = rng.uniform(w / 2, 1 - w / 2), rng.uniform(h / 2, 1 - h / 2)
+        lines.append(f"{rng.randrange(classes)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}")
+    return "\n".join(lines) + "\n"
+
+
+def make_dataset(root: str | Path, images: int, size: tuple[int, int] = (640, 480), boxes: int = 5,
+                 classes: int = 5, duplicates: float = 0.2, video_runs: int = 2) -> dict:
+    """Write the synthetic tree; return the file counts of each part."""
+    root = Path(root)
+    rng = random.Random(0)
+    jpegs = _Images(size)
+
+    cam_a, cam_b = root / "sources" / "cam_a", root / "sources" / "cam_b"
+    dataset_images, dataset_labels = root / "dataset" / "images", root / "dataset" / "labels"
+    stills = root / "stills" / "predict"
+    for d in (cam_a, cam_b, dataset_images, dataset_labels, stills / "labels"):
+        d.mkdir(parents=True, exist_ok=True)
+
+    half = images // 2
+    shared = int(half * duplicates)
+    for i in range(half):
+        jpegs.write(cam_a / f"img_{i:06d}.jpg", i)
+    for i in range(images - half):
+        if i < shared:
+            name = f"img_{i:06d}.jpg"
+            if i % 2:
+                jpegs.write(cam_b / name, i)  # identical to cam_a
+            else:
+                jpegs.write(cam_b / name, images + i)  # same name, other content
+        else:
+            jpegs.write(cam_b / f"cam_b_{i:06d}.jpg", half + i)
+
+    for i in range(images):
+        jpegs.write(dataset_images / f"img_{i:06d}.jpg", i)
+        (dataset_labels / f"img_{i:06d}.txt").write_text(_label_text(rng, boxes, classes))
+        os.link(dataset_images / f"img_{i:06d}.jpg", stills / f"img_{i:06d}.jpg")
+        os.link(dataset_labels / f"img_{i:06d}.txt", stills / "labels" / f"img_{i:06d}.txt")
+
+    frames = max(1, images // max(1, video_runs))
+    for r in range(video_runs):
+        run = root / "videos" / f"predict{r or ''}"
+        (run / "labels").mkdir(parents=True)
+        (run / "clip.avi").touch()
+        for frame in range(1, frames + 1):
+            (run / "labels" / f"clip_{frame}.txt").write_text(_label_text(rng, rng.randint(1, boxes), classes))
+
+    names = [f"class{i}" for i in range(classes)]
+    (root / "classes.txt").write_text("\n".join(names) + "\n")
+    with open(root / "class_map.json", "w") as f:
+        json.dump({str(i): name for i, name in enumerate(names)}, f)
+
+    return {
+        "sources": images,
+        "duplicates": shared,
+        "dataset": images,
+        "frames": frames * video_runs,
+    }
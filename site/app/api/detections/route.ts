@@ -0,0 +1,62 @@
+import { NextResponse } from "next/server"
+import path from "path"
+import { DATA_DIR } from "@/lib/paths"
+
+// Queries a detection index built by `python -m backend.detection_index`.
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url)
+    const index = searchParams.get("index")
+    const cls = searchParams.get("class")
+    if (!index || !cls) {
+      return NextResponse.json({ error: "'index' and 'class' are required" }, { status: 400 })
+    }
+
+    // Only allow index files inside DATA_DIR
+    const indexPath = path.resolve(DATA_DIR, index)
+    if (!indexPath.startsWith(path.resolve(DATA_DIR) + path.sep)) {
+      return NextResponse.json({ error: "Invalid index path" }, { status: 400 })
+    }
+
+    const minConf = parseFloat(searchParams.get("min_conf") || "0")
+    const video = searchParams.get("video")
+    const limit = parseInt(searchParams.get("limit") || "1000", 10)
+
+    const Database = require("better-sqlite3") as typeof import("better-sqlite3")
+    const db = new Database(indexPath, { readonly: true, fileMustExist: true })
+    try {
+      const classRow = /^\d+$/.test(cls)
+        ? { id: Number(cls) }
+        : (db.prepare("SELECT id FROM classes WHERE name = ?").get(cls) as { id: number } | undefined)
+      if (!classRow) {
+        return NextResponse.json([])
+      }
+
+      let sql = `
+        SELECT r.video AS video, r.name || '/labels/' || f.name AS frame_label, d.frame AS frame,
+               MAX(d.confidence) AS max_confidence, COUNT(*) AS detections
+        FROM detections d
+        JOIN label_files f ON f.id = d.file_id
+        JOIN runs r ON r.id = d.run_id
+        WHERE d.class_id = ?`
+      const params: (string | number)[] = [classRow.id]
+      if (minConf > 0) {
+        sql += " AND d.confidence >= ?"
+        params.push(minConf)
+      }
+      if (video) {
+        sql += " AND d.run_id IN (SELECT id FROM runs WHERE video = ?)"
+        params.push(video)
+      }
+      sql += " GROUP BY d.file_id ORDER BY r.name, d.frame LIMIT ?"
+      params.push(limit)
+
+      return NextResponse.json(db.prepare(sql).all(...params))
+    } finally {
+      db.close()
+    }
+  } catch (error) {
+    console.error("Failed to query detections:", error)
+    return NextResponse.json({ error: "Failed to query detections" }, { status: 500 })
+  }
+}
@@ -1,5 +1,6 @@
 import { type NextRequest, NextResponse } from "next/server"
-import { spawn } from "child_process"
+import { spawn, type ChildProcess } from "child_process"
+import type { Readable } from "stream"
 import path from "path"
 import fs from "fs/promises"
 import { WorkflowDatabase } from "@/lib/database"
@@ -27,9 +28,14 @@ export async function POST(request: NextRequest) {
     // Prepare command arguments
     const args = configPath ? ["-m", script, configPath] : ["-m", script]
 
-    let child
+    let child: ChildProcess
     try {
-      child = spawn("python3", args)
+      // Status events are written as NDJSON to fd 3, apart from the text
+      // that the scripts and ultralytics print on stdout.
+      child = spawn("python3", args, {
+        stdio: ["pipe", "pipe", "pipe", "pipe"],
+        env: { ...process.env, WORKFLOW_STATUS_FD: "3" },
+      })
     } catch (error) {
       console.error("Failed to spawn script:", error)
       if (configPath) {
@@ -50,6 +56,8 @@ export async function POST(request: NextRequest) {
 
     const encoder = new TextEncoder()
     let buffer = ""
+    let statusBuffer = ""
+    let predictedCount = 0
 
     // Insert initial database row based on action
     let recordId: number | null = null
@@ -81,7 +89,35 @@ export async function POST(request: NextRequest) {
           )
         }
 
-        child.stdout.on("data", (chunk) => {
+        const statusStream = child.stdio[3] as Readable | null
+        statusStream?.on("data", (chunk) => {
+          statusBuffer += chunk.toString()
+          const lines = statusBuffer.split(/\r?\n/)
+          statusBuffer = lines.pop() || ""
+
+          for (const line of lines) {
+            if (!line.trim()) continue
+            let status
+            try {
+              status = JSON.parse(line)
+            } catch {
+              continue
+            }
+            send("status", status)
+
+            // Per-frame events arrive folded into periodic summaries.
+            if (action === "predict" && recordId !== null) {
+              const frames =
+                status.event === "summary" ? status.counts?.prediction ?? 0 : status.event === "prediction" ? 1 : 0
+              if (frames > 0) {
+                predictedCount += frames
+                WorkflowDatabase.updatePrediction(recordId, { results_count: predictedCount })
+              }
+            }
+          }
+        })
+
+        child.stdout?.on("data", (chunk) => {
           const text = chunk.toString()
           send("stdout", text)
           buffer += text
@@ -105,7 +141,7 @@ export async function POST(request: NextRequest) {
           }
         })
 
-        child.stderr.on("data", (chunk) => {
+        child.stderr?.on("data", (chunk) => {
           send("stderr", chunk.toString())
         })
 